@@ -2,18 +2,38 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import timedelta
+import time
+import uuid
 
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token, verify_token
+from app.core.principal import Principal, principal_cache, principal_claims
+from app.core.revocation import ensure_not_revoked, revoked_tokens
+from app.core.security import verify_and_update_password, get_password_hash, create_access_token, create_refresh_token, decode_token, forget_token, password_hasher
 from app.core.config import settings
 from app.models.user import User, MusicAccount
 from app.schemas.user import UserCreate, UserLogin, Token, UserResponse
 from app.services.spotify import SpotifyService
+from app.services.outbound_quota import QuotaExceeded
+from app.api.v1.endpoints.users import get_current_user
 # Apple Music service removed - focusing on Spotify only
 
 router = APIRouter()
 security = HTTPBearer()
 
+def _issue_tokens(user, session_id: str) -> dict:
+    session = {"sub": str(user.id), "sid": session_id}
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={**session, **principal_claims(user)}, expires_delta=access_token_expires
+    )
+    refresh_token = create_refresh_token(data=session)
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
 @router.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
@@ -28,7 +48,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.run(get_password_hash, user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -47,67 +67,46 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_credentials.email).first()
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.run(
+            verify_and_update_password, user_credentials.password, user.hashed_password
+        )
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The stored hash used an older scheme or cost; replace it while we have the password
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    # Every token issued for this login shares one session id, so logout can revoke them all
+    return _issue_tokens(user, session_id=uuid.uuid4().hex)
 
 @router.post("/refresh", response_model=Token)
 async def refresh_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    user_id = verify_token(credentials.credentials)
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    claims = decode_token(credentials.credentials, token_type="refresh")
+    await ensure_not_revoked(claims)
+    user = await principal_cache.resolve(claims, db)
+    # Refresh tokens are single use: the new pair replaces this one
+    await revoked_tokens.revoke(claims["jti"], claims["exp"])
+    forget_token(credentials.credentials)
+    return _issue_tokens(user, session_id=claims.get("sid") or uuid.uuid4().hex)
 
 @router.get("/spotify/login")
-async def spotify_login(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def spotify_login(user: Principal = Depends(get_current_user)):
     try:
-        # Verify user is authenticated
-        user_id = verify_token(credentials.credentials)
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
         spotify_service = SpotifyService()
         auth_url = spotify_service.get_auth_url(state=str(user.id))
         return {"auth_url": auth_url}
@@ -157,7 +156,7 @@ async def spotify_callback(
                 detail="User not found"
             )
         
-        spotify_service = SpotifyService()
+        spotify_service = SpotifyService(user.id)
         token_info = await spotify_service.get_access_token(code)
         user_info = await spotify_service.get_user_info(token_info["access_token"])
         
@@ -207,6 +206,8 @@ async def spotify_callback(
             }
         }
         
+    except QuotaExceeded:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -223,5 +224,15 @@ async def spotify_callback(
 
 @router.post("/logout")
 async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    # In a real implementation, you might want to blacklist the token
+    claims = decode_token(credentials.credentials)
+    if "sid" in claims:
+        # Revoke the whole login session, including its refresh tokens, until the
+        # longest-lived of them has expired
+        session_expires = time.time() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds()
+        await revoked_tokens.revoke(claims["sid"], session_expires)
+    elif "jti" in claims:
+        # Tokens issued before sessions existed: only this token can be revoked
+        await revoked_tokens.revoke(claims["jti"], claims["exp"])
+    # The revocation list rejects it anyway; its cached claims are no longer needed
+    forget_token(credentials.credentials)
     return {"message": "Successfully logged out"}
\ No newline at end of file
@@ -1,75 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.models.user import User, Friendship
-from app.schemas.user import FriendshipRequest, FriendshipResponse
+from app.schemas.user import FriendshipRequest, FriendshipResponse, UserSummary, FriendSuggestion, FriendCountResponse
 from app.api.v1.endpoints.users import get_current_user
+from app.core.principal import Principal
+from app.services.friends import FriendRepository, INCLUDE_OPTIONS
+from app.services.friend_graph import friend_graph
+from app.utils.pagination import set_next_cursor
+from app.utils.loaders import Loaders, get_loaders
 
 router = APIRouter()
 security = HTTPBearer()
 
+def parse_include(include: Optional[str] = Query(default=None, description="Comma-separated: presence, now_playing")) -> set:
+    if not include:
+        return set()
+    
+    fields = {field.strip() for field in include.split(",") if field.strip()}
+    unknown = fields - INCLUDE_OPTIONS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include option(s): {', '.join(sorted(unknown))}"
+        )
+    return fields
+
+def ensure_can_view_friends(db: Session, current_user: Principal, user_id: int):
+    """Only the user and their accepted friends may see who their friends are"""
+    if user_id == current_user.id:
+        return
+    # Checked against the friendship row, not the per-worker friend graph, which may lag
+    friendship = FriendRepository(db).get_between(current_user.id, user_id)
+    if friendship is None or friendship.status != "accepted":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view friends of yourself or your friends"
+        )
+
 @router.get("/", response_model=List[FriendshipResponse])
 async def get_friends(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    limit: int = Query(default=50, le=200),
+    cursor: Optional[str] = Query(default=None),
+    include: set = Depends(parse_include),
     db: Session = Depends(get_db)
 ):
-    friendships = db.query(Friendship).join(
-        User, Friendship.friend_id == User.id
-    ).filter(
-        Friendship.user_id == current_user.id,
-        Friendship.status == "accepted"
-    ).all()
-    
-    friends = []
-    for friendship in friendships:
-        friend = db.query(User).filter(User.id == friendship.friend_id).first()
-        friends.append({
-            "id": friendship.id,
-            "friend_id": friend.id,
-            "friend_username": friend.username,
-            "friend_full_name": friend.full_name,
-            "friend_avatar_url": friend.avatar_url,
-            "status": friendship.status,
-            "created_at": friendship.created_at
-        })
+    friends, next_cursor = FriendRepository(db).list_friends(current_user.id, limit, cursor, include)
+    set_next_cursor(response, next_cursor)
     
     return friends
 
 @router.get("/requests", response_model=List[FriendshipResponse])
 async def get_friend_requests(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    limit: int = Query(default=50, le=200),
+    cursor: Optional[str] = Query(default=None),
+    include: set = Depends(parse_include),
     db: Session = Depends(get_db)
 ):
     # Get pending requests sent to current user
-    requests = db.query(Friendship).join(
-        User, Friendship.user_id == User.id
-    ).filter(
-        Friendship.friend_id == current_user.id,
-        Friendship.status == "pending"
-    ).all()
-    
-    friend_requests = []
-    for request in requests:
-        requester = db.query(User).filter(User.id == request.user_id).first()
-        friend_requests.append({
-            "id": request.id,
-            "friend_id": requester.id,
-            "friend_username": requester.username,
-            "friend_full_name": requester.full_name,
-            "friend_avatar_url": requester.avatar_url,
-            "status": request.status,
-            "created_at": request.created_at
-        })
+    friend_requests, next_cursor = FriendRepository(db).list_incoming_requests(current_user.id, limit, cursor, include)
+    set_next_cursor(response, next_cursor)
     
     return friend_requests
 
+@router.get("/mutual/{user_id}", response_model=List[UserSummary])
+async def get_mutual_friends(
+    user_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
+):
+    ensure_can_view_friends(db, current_user, user_id)
+    mutual_ids = friend_graph.mutual_friends(db, current_user.id, user_id)
+    users = await loaders.users.load_many(mutual_ids)
+    return [user for user in users if user is not None]
+
+@router.get("/suggestions", response_model=List[FriendSuggestion])
+async def get_friend_suggestions(
+    limit: int = Query(default=10, le=50),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
+):
+    suggestions = friend_graph.suggestions(db, current_user.id, limit)
+    users = await loaders.users.load_many(user_id for user_id, _ in suggestions)
+    
+    return [
+        {
+            "id": user.id,
+            "username": user.username,
+            "full_name": user.full_name,
+            "avatar_url": user.avatar_url,
+            "mutual_count": mutual_count
+        }
+        for (_, mutual_count), user in zip(suggestions, users)
+        if user is not None and user.is_active
+    ]
+
+@router.get("/count", response_model=FriendCountResponse)
+async def get_friend_count(
+    user_id: Optional[int] = Query(default=None),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if user_id is None:
+        user_id = current_user.id
+    ensure_can_view_friends(db, current_user, user_id)
+    return {"user_id": user_id, "friend_count": friend_graph.friend_count(db, user_id)}
+
 @router.post("/request")
 async def send_friend_request(
     request_data: FriendshipRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Find user by email
@@ -87,10 +137,8 @@ async def send_friend_request(
         )
     
     # Check if friendship already exists
-    existing_friendship = db.query(Friendship).filter(
-        ((Friendship.user_id == current_user.id) & (Friendship.friend_id == friend.id)) |
-        ((Friendship.user_id == friend.id) & (Friendship.friend_id == current_user.id))
-    ).first()
+    friend_repository = FriendRepository(db)
+    existing_friendship = friend_repository.get_between(current_user.id, friend.id)
     
     if existing_friendship:
         if existing_friendship.status == "accepted":
@@ -105,28 +153,34 @@ async def send_friend_request(
             )
     
     # Create friend request
+    user_low_id, user_high_id = Friendship.pair(current_user.id, friend.id)
     friendship = Friendship(
-        user_id=current_user.id,
-        friend_id=friend.id,
+        user_low_id=user_low_id,
+        user_high_id=user_high_id,
+        requester_id=current_user.id,
         status="pending"
     )
     
     db.add(friendship)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # The other user sent a request at the same moment; the pair index kept only one
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Friend request already sent"
+        )
     
     return {"message": f"Friend request sent to {friend.username}"}
 
 @router.post("/accept/{friendship_id}")
 async def accept_friend_request(
     friendship_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    friendship = db.query(Friendship).filter(
-        Friendship.id == friendship_id,
-        Friendship.friend_id == current_user.id,
-        Friendship.status == "pending"
-    ).first()
+    friendship = FriendRepository(db).get_incoming_request(friendship_id, current_user.id)
     
     if not friendship:
         raise HTTPException(
@@ -134,32 +188,20 @@ async def accept_friend_request(
             detail="Friend request not found"
         )
     
-    # Update status
+    # The same row now represents the friendship in both directions
     friendship.status = "accepted"
-    
-    # Create reciprocal friendship
-    reciprocal_friendship = Friendship(
-        user_id=current_user.id,
-        friend_id=friendship.user_id,
-        status="accepted"
-    )
-    
-    db.add(reciprocal_friendship)
     db.commit()
+    await friend_graph.add_edge(current_user.id, friendship.requester_id)
     
     return {"message": "Friend request accepted"}
 
 @router.post("/decline/{friendship_id}")
 async def decline_friend_request(
     friendship_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    friendship = db.query(Friendship).filter(
-        Friendship.id == friendship_id,
-        Friendship.friend_id == current_user.id,
-        Friendship.status == "pending"
-    ).first()
+    friendship = FriendRepository(db).get_incoming_request(friendship_id, current_user.id)
     
     if not friendship:
         raise HTTPException(
@@ -175,24 +217,19 @@ async def decline_friend_request(
 @router.delete("/{friend_id}")
 async def remove_friend(
     friend_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Remove both directions of friendship
-    friendships = db.query(Friendship).filter(
-        ((Friendship.user_id == current_user.id) & (Friendship.friend_id == friend_id)) |
-        ((Friendship.user_id == friend_id) & (Friendship.friend_id == current_user.id))
-    ).all()
+    friendship = FriendRepository(db).get_between(current_user.id, friend_id)
     
-    if not friendships:
+    if not friendship:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Friendship not found"
         )
     
-    for friendship in friendships:
-        db.delete(friendship)
-    
+    db.delete(friendship)
     db.commit()
+    await friend_graph.remove_edge(current_user.id, friend_id)
     
     return {"message": "Friend removed successfully"}
\ No newline at end of file
@@ -1,44 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.security import verify_token
 from app.models.user import User
 from app.models.music import Track, TrendingTrack, UserFavorite
-from app.schemas.music import TrackResponse, TrendingTrackResponse, UserFavoriteResponse
+from app.schemas.music import TrackResponse, TrendingTrackResponse, UserFavoriteResponse, AutocompleteSuggestion
 from app.api.v1.endpoints.users import get_current_user
+from app.core.principal import Principal
+from app.services.search import TrackSearchService
+from app.services.autocomplete import autocomplete_index
+from app.utils.pagination import paginate, set_next_cursor
+from app.utils.loaders import Loaders, get_loaders
+from app.utils.cache import cache_service, cached
+from app.services.cache_warmer import cache_warmer
 
 router = APIRouter()
 security = HTTPBearer()
 
+async def load_trending_tracks() -> list:
+    """The top 50 trending tracks, serialized for the cache"""
+    db = SessionLocal()
+    try:
+        trending = db.query(TrendingTrack).join(Track).order_by(TrendingTrack.rank).limit(50).all()
+        
+        # If no trending data, return mock data
+        if not trending:
+            mock_trending = [
+                {"track": {"id": 1, "title": "Blinding Lights", "artist": "The Weeknd", "album": "After Hours", "duration_ms": 200040, "genre": "Pop", "popularity": 95, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 1, "plays_count": 2100000, "growth_percentage": 15},
+                {"track": {"id": 2, "title": "Shape of You", "artist": "Ed Sheeran", "album": "÷", "duration_ms": 233712, "genre": "Pop", "popularity": 92, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 2, "plays_count": 1800000, "growth_percentage": 12},
+                {"track": {"id": 3, "title": "Bad Habits", "artist": "Ed Sheeran", "album": "=", "duration_ms": 231146, "genre": "Pop", "popularity": 88, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 3, "plays_count": 1500000, "growth_percentage": 8},
+                {"track": {"id": 4, "title": "Stay", "artist": "The Kid LAROI", "album": "F*CK LOVE 3", "duration_ms": 141806, "genre": "Hip-Hop", "popularity": 90, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 4, "plays_count": 1300000, "growth_percentage": 22}
+            ]
+            return mock_trending
+        
+        return [
+            TrendingTrackResponse.model_validate(item, from_attributes=True).model_dump(mode="json")
+            for item in trending
+        ]
+    finally:
+        db.close()
+
+# Trending tracks for 30 minutes, served stale for 5 more while refreshing
+cache_warmer.register("trending_tracks", load_trending_tracks, expire=1800, stale_ttl=300)
+
 @router.get("/trending", response_model=List[TrendingTrackResponse])
 async def get_trending_tracks(
-    limit: int = Query(default=10, le=50),
-    db: Session = Depends(get_db)
+    limit: int = Query(default=10, le=50)
 ):
-    trending = db.query(TrendingTrack).join(Track).order_by(TrendingTrack.rank).limit(limit).all()
-    
-    # If no trending data, return mock data
-    if not trending:
-        mock_trending = [
-            {"track": {"id": 1, "title": "Blinding Lights", "artist": "The Weeknd", "album": "After Hours", "duration_ms": 200040, "genre": "Pop", "popularity": 95, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 1, "plays_count": 2100000, "growth_percentage": 15},
-            {"track": {"id": 2, "title": "Shape of You", "artist": "Ed Sheeran", "album": "÷", "duration_ms": 233712, "genre": "Pop", "popularity": 92, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 2, "plays_count": 1800000, "growth_percentage": 12},
-            {"track": {"id": 3, "title": "Bad Habits", "artist": "Ed Sheeran", "album": "=", "duration_ms": 231146, "genre": "Pop", "popularity": 88, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 3, "plays_count": 1500000, "growth_percentage": 8},
-            {"track": {"id": 4, "title": "Stay", "artist": "The Kid LAROI", "album": "F*CK LOVE 3", "duration_ms": 141806, "genre": "Hip-Hop", "popularity": 90, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rank": 4, "plays_count": 1300000, "growth_percentage": 22}
-        ]
-        return mock_trending
-    
-    return [
-        {
-            "track": item.track,
-            "rank": item.rank,
-            "plays_count": item.plays_count,
-            "growth_percentage": item.growth_percentage
-        }
-        for item in trending
-    ]
+    # One shared entry for every limit, kept warm by the cache warmer
+    trending = await cache_warmer.get("trending_tracks")
+    return trending[:limit]
 
 @router.get("/top-songs", response_model=List[TrackResponse])
 async def get_top_songs(
@@ -56,17 +70,23 @@ async def get_top_songs(
     return mock_top_songs[:limit]
 
 @router.get("/favorites", response_model=List[UserFavoriteResponse])
+@cached(List[UserFavoriteResponse], tags=["user:{current_user.id}:favorites"])
 async def get_user_favorites(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     limit: int = Query(default=10, le=50),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    favorites = db.query(UserFavorite).join(Track).filter(
-        UserFavorite.user_id == current_user.id
-    ).limit(limit).all()
+    favorites, next_cursor = paginate(
+        db.query(UserFavorite).join(Track).filter(UserFavorite.user_id == current_user.id),
+        [(UserFavorite.id, False)], cursor, limit, lambda fav: [fav.id]
+    )
+    set_next_cursor(response, next_cursor)
     
     # If no favorites, return mock data
-    if not favorites:
+    if not favorites and not cursor:
         mock_favorites = [
             {"track": {"id": 1, "title": "Watermelon Sugar", "artist": "Harry Styles", "album": "Fine Line", "duration_ms": 174000, "genre": "Pop", "popularity": 89, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rating": 5, "created_at": "2024-01-01T00:00:00"},
             {"track": {"id": 2, "title": "Levitating", "artist": "Dua Lipa", "album": "Future Nostalgia", "duration_ms": 203064, "genre": "Pop", "popularity": 91, "cover_image_url": None, "preview_url": None, "spotify_id": None, "apple_music_id": None, "created_at": "2024-01-01T00:00:00"}, "rating": 5, "created_at": "2024-01-01T00:00:00"},
@@ -75,20 +95,22 @@ async def get_user_favorites(
         ]
         return mock_favorites
     
+    tracks = await loaders.tracks.load_many(fav.track_id for fav in favorites)
+    
     return [
         {
-            "track": fav.track,
+            "track": track,
             "rating": fav.rating,
             "created_at": fav.created_at
         }
-        for fav in favorites
+        for fav, track in zip(favorites, tracks)
     ]
 
 @router.post("/favorites/{track_id}")
 async def add_to_favorites(
     track_id: int,
     rating: Optional[int] = Query(default=None, ge=1, le=5),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Check if track exists
@@ -109,6 +131,7 @@ async def add_to_favorites(
         if rating:
             existing_favorite.rating = rating
             db.commit()
+        await cache_service.invalidate_tags(f"user:{current_user.id}:favorites")
         return {"message": "Track updated in favorites"}
     
     # Add to favorites
@@ -119,13 +142,14 @@ async def add_to_favorites(
     )
     db.add(favorite)
     db.commit()
+    await cache_service.invalidate_tags(f"user:{current_user.id}:favorites")
     
     return {"message": "Track added to favorites"}
 
 @router.delete("/favorites/{track_id}")
 async def remove_from_favorites(
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     favorite = db.query(UserFavorite).filter(
@@ -141,17 +165,29 @@ async def remove_from_favorites(
     
     db.delete(favorite)
     db.commit()
+    await cache_service.invalidate_tags(f"user:{current_user.id}:favorites")
     
     return {"message": "Track removed from favorites"}
 
 @router.get("/search")
 async def search_tracks(
+    response: Response,
     q: str = Query(..., min_length=1),
     limit: int = Query(default=20, le=50),
+    cursor: Optional[str] = Query(default=None),
     db: Session = Depends(get_db)
 ):
-    tracks = db.query(Track).filter(
-        Track.title.contains(q) | Track.artist.contains(q) | Track.album.contains(q)
-    ).limit(limit).all()
+    search_service = TrackSearchService(db)
+    tracks, next_cursor = search_service.search_page(q, limit, cursor)
+    set_next_cursor(response, next_cursor)
     
-    return tracks
\ No newline at end of file
+    return tracks
+
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=10, le=20),
+    db: Session = Depends(get_db)
+):
+    autocomplete_index.refresh(db)
+    return autocomplete_index.complete(q, limit)
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.models.user import User
 from app.models.music import Playlist, PlaylistTrack, Track
 from app.schemas.music import (
@@ -11,17 +11,30 @@ from app.schemas.music import (
     PlaylistWithTracks, PlaylistTrackAdd, SyncRequest, SyncResponse
 )
 from app.api.v1.endpoints.users import get_current_user
+from app.core.principal import Principal
 from app.services.playlist_sync import PlaylistSyncService
+from app.utils.pagination import paginate, set_next_cursor
+from app.utils.loaders import Loaders
+from app.utils.cache import cache_service, cached
+from app.services.cache_warmer import cache_warmer
 
 router = APIRouter()
 security = HTTPBearer()
 
 @router.get("/", response_model=List[PlaylistResponse])
+@cached(List[PlaylistResponse], tags=["user:{current_user.id}:playlists"])
 async def get_user_playlists(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    limit: int = Query(default=50, le=200),
+    cursor: Optional[str] = Query(default=None),
     db: Session = Depends(get_db)
 ):
-    playlists = db.query(Playlist).filter(Playlist.user_id == current_user.id).all()
+    playlists, next_cursor = paginate(
+        db.query(Playlist).filter(Playlist.user_id == current_user.id),
+        [(Playlist.id, False)], cursor, limit, lambda playlist: [playlist.id]
+    )
+    set_next_cursor(response, next_cursor)
     
     # Add track count to each playlist
     for playlist in playlists:
@@ -33,7 +46,7 @@ async def get_user_playlists(
 @router.post("/", response_model=PlaylistResponse)
 async def create_playlist(
     playlist_data: PlaylistCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     playlist = Playlist(
@@ -46,45 +59,62 @@ async def create_playlist(
     db.add(playlist)
     db.commit()
     db.refresh(playlist)
+    await cache_service.invalidate_tags(f"user:{current_user.id}:playlists")
     
     playlist.track_count = 0
     return playlist
 
+async def load_playlist_detail(playlist_id: int) -> Optional[dict]:
+    """A playlist with its tracks, serialized for the cache; None if it does not exist"""
+    db = SessionLocal()
+    try:
+        playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
+        if not playlist:
+            return None
+        
+        # Get tracks
+        playlist_tracks = db.query(PlaylistTrack).filter(
+            PlaylistTrack.playlist_id == playlist_id
+        ).order_by(PlaylistTrack.position).all()
+        
+        tracks = await Loaders(db).tracks.load_many(pt.track_id for pt in playlist_tracks)
+        tracks = [track for track in tracks if track is not None]
+        
+        return PlaylistWithTracks.model_validate({
+            **playlist.__dict__,
+            "tracks": tracks,
+            "track_count": len(tracks)
+        }, from_attributes=True).model_dump(mode="json")
+    finally:
+        db.close()
+
+cache_warmer.register(
+    "playlist_detail", load_playlist_detail, expire=300,
+    tags=("playlist:{0}",), parameterized=True
+)
+
 @router.get("/{playlist_id}", response_model=PlaylistWithTracks)
 async def get_playlist(
     playlist_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user)
 ):
-    playlist = db.query(Playlist).filter(
-        Playlist.id == playlist_id,
-        Playlist.user_id == current_user.id
-    ).first()
+    playlist = await cache_warmer.get("playlist_detail", playlist_id, record=False)
     
-    if not playlist:
+    if not playlist or playlist["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Playlist not found"
         )
     
-    # Get tracks
-    playlist_tracks = db.query(PlaylistTrack).join(Track).filter(
-        PlaylistTrack.playlist_id == playlist_id
-    ).order_by(PlaylistTrack.position).all()
-    
-    tracks = [pt.track for pt in playlist_tracks]
-    
-    return {
-        **playlist.__dict__,
-        "tracks": tracks,
-        "track_count": len(tracks)
-    }
+    # Only the owner's reads count towards warming
+    cache_warmer.record_hit("playlist_detail", playlist_id)
+    return playlist
 
 @router.put("/{playlist_id}", response_model=PlaylistResponse)
 async def update_playlist(
     playlist_id: int,
     playlist_update: PlaylistUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     playlist = db.query(Playlist).filter(
@@ -103,6 +133,7 @@ async def update_playlist(
     
     db.commit()
     db.refresh(playlist)
+    await cache_service.invalidate_tags(f"playlist:{playlist_id}", f"user:{current_user.id}:playlists")
     
     track_count = db.query(PlaylistTrack).filter(PlaylistTrack.playlist_id == playlist.id).count()
     playlist.track_count = track_count
@@ -112,7 +143,7 @@ async def update_playlist(
 @router.delete("/{playlist_id}")
 async def delete_playlist(
     playlist_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     playlist = db.query(Playlist).filter(
@@ -132,6 +163,7 @@ async def delete_playlist(
     # Delete playlist
     db.delete(playlist)
     db.commit()
+    await cache_service.invalidate_tags(f"playlist:{playlist_id}", f"user:{current_user.id}:playlists")
     
     return {"message": "Playlist deleted successfully"}
 
@@ -139,7 +171,7 @@ async def delete_playlist(
 async def add_track_to_playlist(
     playlist_id: int,
     track_data: PlaylistTrackAdd,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     playlist = db.query(Playlist).filter(
@@ -191,6 +223,7 @@ async def add_track_to_playlist(
     
     db.add(playlist_track)
     db.commit()
+    await cache_service.invalidate_tags(f"playlist:{playlist_id}", f"user:{current_user.id}:playlists")
     
     return {"message": "Track added to playlist"}
 
@@ -198,7 +231,7 @@ async def add_track_to_playlist(
 async def remove_track_from_playlist(
     playlist_id: int,
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     playlist = db.query(Playlist).filter(
@@ -225,6 +258,7 @@ async def remove_track_from_playlist(
     
     db.delete(playlist_track)
     db.commit()
+    await cache_service.invalidate_tags(f"playlist:{playlist_id}", f"user:{current_user.id}:playlists")
     
     return {"message": "Track removed from playlist"}
 
@@ -232,7 +266,7 @@ async def remove_track_from_playlist(
 async def sync_playlist(
     playlist_id: int,
     sync_request: SyncRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     playlist = db.query(Playlist).filter(
@@ -246,7 +280,11 @@ async def sync_playlist(
             detail="Playlist not found"
         )
     
-    sync_service = PlaylistSyncService(db)
-    result = await sync_service.sync_playlist(current_user.id, playlist_id, sync_request.platforms)
+    sync_service = PlaylistSyncService(db, current_user.id)
+    try:
+        result = await sync_service.sync_playlist(current_user.id, playlist_id, sync_request.platforms)
+    finally:
+        # A sync stopped by the outbound quota may already have saved platform ids
+        await cache_service.invalidate_tags(f"playlist:{playlist_id}", f"user:{current_user.id}:playlists")
     
     return result
\ No newline at end of file
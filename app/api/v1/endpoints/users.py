@@ -1,19 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
-from app.core.security import verify_token
+from app.core.principal import Principal, authenticate
 from app.models.user import User, MusicAccount
 from app.schemas.user import UserResponse, UserUpdate, MusicAccountResponse
+from app.utils.loaders import Loaders, get_loaders
+from app.utils.cache import cache_service, cached
+from app.services.outbound_quota import outbound_quota
 
 router = APIRouter()
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    user_id = verify_token(credentials.credentials)
-    user = db.query(User).filter(User.id == int(user_id)).first()
+MAX_BATCH_USER_IDS = 100
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Principal:
+    # Token claims or the principal cache; the users table is only hit on a cache miss
+    return await authenticate(request, credentials.credentials, db)
+
+async def get_current_user_row(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
+    """The full User row, for endpoints that return or modify it"""
+    user = db.query(User).filter(User.id == current_user.id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -22,13 +31,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     return user
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_row)):
     return current_user
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_row),
     db: Session = Depends(get_db)
 ):
     for field, value in user_update.dict(exclude_unset=True).items():
@@ -36,11 +45,12 @@ async def update_current_user(
     
     db.commit()
     db.refresh(current_user)
+    await cache_service.invalidate_tags(f"user:{current_user.id}")
     return current_user
 
 @router.get("/me/music-accounts", response_model=List[MusicAccountResponse])
 async def get_user_music_accounts(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     accounts = db.query(MusicAccount).filter(
@@ -49,10 +59,15 @@ async def get_user_music_accounts(
     ).all()
     return accounts
 
+@router.get("/me/api-usage")
+async def get_music_api_usage(current_user: Principal = Depends(get_current_user)):
+    """This user's recent Spotify / Apple Music calls against their share of the app quota"""
+    return outbound_quota.usage(current_user.id)
+
 @router.delete("/me/music-accounts/{platform}")
 async def disconnect_music_account(
     platform: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     account = db.query(MusicAccount).filter(
@@ -71,10 +86,34 @@ async def disconnect_music_account(
     
     return {"message": f"{platform.title()} account disconnected successfully"}
 
+@router.get("", response_model=List[UserResponse])
+async def get_users_by_ids(
+    ids: str = Query(..., description="Comma-separated user ids"),
+    current_user: Principal = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    try:
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in ids.split(",") if user_id.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    
+    if len(user_ids) > MAX_BATCH_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_USER_IDS} ids per request"
+        )
+    
+    users = await loaders.users.load_many(user_ids)
+    return [user for user in users if user is not None]
+
 @router.get("/{user_id}", response_model=UserResponse)
+@cached(UserResponse, tags=["user:{user_id}"])
 async def get_user_by_id(
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.id == user_id).first()
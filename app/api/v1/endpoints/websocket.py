@@ -1,8 +1,9 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.security import verify_token
-from app.models.user import User
+from app.core.principal import authenticate
+from app.schemas.user import NowPlaying
 from app.websocket.manager import manager
 import json
 
@@ -18,15 +19,13 @@ async def websocket_endpoint(
     """WebSocket endpoint for real-time updates"""
     try:
         # Verify token
-        token_user_id = verify_token(token)
-        if int(token_user_id) != user_id:
-            await websocket.close(code=1008, reason="Invalid token")
+        try:
+            principal = await authenticate(websocket, token, db)
+        except HTTPException as e:
+            await websocket.close(code=1008, reason=e.detail)
             return
-        
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            await websocket.close(code=1008, reason="User not found")
+        if principal.id != user_id:
+            await websocket.close(code=1008, reason="Invalid token")
             return
         
         # Connect user
@@ -45,6 +44,16 @@ async def websocket_endpoint(
                         "message": "Connection alive"
                     }, websocket)
                 
+                elif message.get("type") == "now_playing":
+                    track = message.get("track")
+                    try:
+                        manager.set_now_playing(user_id, NowPlaying.model_validate(track) if track else None)
+                    except ValidationError:
+                        await manager.send_personal_message({
+                            "type": "error",
+                            "message": "Invalid now_playing track"
+                        }, websocket)
+                
                 elif message.get("type") == "status":
                     # Update user status or handle status messages
                     await manager.send_personal_message({
@@ -13,9 +13,37 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Authenticated principals are cached per user id and dropped when the user row changes
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    # Put username/active claims in access tokens so requests authenticate without any lookup.
+    # Deactivation then takes effect only when the token expires (or is revoked).
+    AUTH_TOKEN_CLAIMS: bool = False
+    # Verified token claims are kept in-process (by token digest) until the token expires
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 3600  # upper bound, tokens are re-verified at least this often
+    # Revoked token/session ids are screened with an in-process Bloom filter sized for
+    # CAPACITY ids; possible hits (ERROR_RATE of the rest) are confirmed in Redis.
+    # Rebuilding from Redis drops expired ids.
+    TOKEN_REVOCATION_CAPACITY: int = 100000
+    TOKEN_REVOCATION_ERROR_RATE: float = 0.001
+    TOKEN_REVOCATION_REBUILD_SECONDS: int = 300
+    # Password hashing: the first scheme hashes new passwords, older schemes and weaker
+    # cost settings are rehashed on the next successful login. Size capacity with
+    # benchmark_password_hashing.py. argon2 requires argon2-cffi.
+    PASSWORD_HASH_SCHEMES: List[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 1
+    # Hashing runs on its own thread pool; jobs beyond MAX_PENDING are rejected with 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
     
     # Database
     DATABASE_URL: str = "sqlite:///./chordcircle.db"
+    # Apply pending migrations at startup instead of failing the revision check.
+    # Keep this off when several workers boot at once; run `alembic upgrade head` in the deploy step.
+    AUTO_MIGRATE: bool = False
     
     # CORS
     ALLOWED_HOSTS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -28,10 +56,63 @@ class Settings(BaseSettings):
     APPLE_MUSIC_TEAM_ID: str = ""
     APPLE_MUSIC_KEY_ID: str = ""
     APPLE_MUSIC_PRIVATE_KEY: str = ""
+    # Outbound calls per sliding window, shared by all users of this worker (set to the
+    # platform's app-wide limit divided by the number of workers). While the budget is
+    # contended each waiting user gets an equal share; longer waits fail the call.
+    SPOTIFY_CALLS_PER_WINDOW: int = 150
+    APPLE_MUSIC_CALLS_PER_WINDOW: int = 150
+    OUTBOUND_QUOTA_WINDOW_SECONDS: float = 30
+    OUTBOUND_QUOTA_MAX_WAIT_SECONDS: float = 10
+    
+    # Autocomplete prefix index
+    AUTOCOMPLETE_SNAPSHOT_PATH: str = "./autocomplete_index.json"
+    AUTOCOMPLETE_REFRESH_SECONDS: int = 30
+    
+    # Friend graph cache
+    FRIEND_GRAPH_MAX_USERS: int = 100000
+    FRIEND_GRAPH_TTL_SECONDS: int = 300
     
     # Redis (for caching and sessions)
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Rate limits are counted in Redis so they hold across workers; each worker
+    # counts on its own while Redis is unreachable
+    RATE_LIMIT_ENABLED: bool = True
+    # Reverse proxies (addresses or CIDR ranges) whose X-Forwarded-For header is believed.
+    # Empty: clients are identified by the connection's address only.
+    TRUSTED_PROXIES: List[str] = []
+    RATE_LIMIT_REDIS: bool = True
+    # Active keys tracked by the in-process fallback; idle keys are evicted first
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 100000
+    
+    # In-process L1 cache in front of Redis. The TTL bounds how stale a worker can
+    # be if it misses an invalidation message (e.g. while reconnecting to Redis).
+    CACHE_L1_MAX_ENTRIES: int = 10000
+    CACHE_L1_TTL_SECONDS: int = 30
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    # Value encoding: msgpack (keeps datetimes as datetimes), orjson or json (datetimes come
+    # back as ISO strings); compression: none, zlib or lz4 (lz4 is an optional install)
+    CACHE_CODEC: str = "msgpack"
+    CACHE_COMPRESSION: str = "zlib"
+    CACHE_COMPRESSION_MIN_BYTES: int = 1024
+    # Redis connection pool shared by the worker; every command is bounded by the op timeout
+    CACHE_MAX_CONNECTIONS: int = 50
+    CACHE_OP_TIMEOUT_SECONDS: float = 0.25
+    CACHE_RECONNECT_BACKOFF_SECONDS: float = 0.5
+    CACHE_RECONNECT_BACKOFF_MAX_SECONDS: float = 30.0
+    # Cross-worker single-flight lock for get_or_compute
+    CACHE_LOCK_TIMEOUT_SECONDS: float = 10.0
+    CACHE_LOCK_WAIT_SECONDS: float = 2.0
+    CACHE_LOCK_POLL_SECONDS: float = 0.05
+    # Endpoint response caching (@cached); writes invalidate by tag, the TTL is a backstop
+    CACHE_ENDPOINT_TTL_SECONDS: int = 300
+    CACHE_TAG_TTL_SECONDS: int = 86400
+    # Rows shared by the request loaders (users, tracks); row changes invalidate them on commit
+    CACHE_ROW_TTL_SECONDS: int = 600
+    # Cache warmer: runs at startup and on this interval, most requested entries first
+    CACHE_WARM_INTERVAL_SECONDS: int = 600
+    CACHE_WARM_MAX_KEYS: int = 100
+    
     # Email (for notifications)
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import List, Optional
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+class SchemaRevisionMismatch(RuntimeError):
+    """Raised at startup when the database is not at the migration head"""
+
+def get_alembic_config() -> Config:
+    """Build the Alembic config, independent of the current working directory"""
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def get_head_revision() -> Optional[str]:
+    """Latest revision shipped with the code"""
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+def get_current_revision(engine: Engine) -> Optional[str]:
+    """Revision recorded in the database's alembic_version table"""
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+def check_schema_revision(engine: Engine):
+    """Verify the database schema matches the code without touching any table but alembic_version"""
+    head = get_head_revision()
+    current = get_current_revision(engine)
+
+    if current == head:
+        return
+
+    if current is None:
+        raise SchemaRevisionMismatch(
+            "Database has no migration revision. Run `alembic upgrade head` "
+            "(or `alembic stamp 0001` first if the tables were created by create_all)."
+        )
+
+    raise SchemaRevisionMismatch(
+        f"Database schema is at revision {current}, expected {head}. Run `alembic upgrade head`."
+    )
+
+def upgrade_to_head():
+    """Apply all pending migrations"""
+    command.upgrade(get_alembic_config(), "head")
+
+def _existing_indexes(table_name: str) -> List[str]:
+    return [index["name"] for index in inspect(op.get_bind()).get_indexes(table_name)]
+
+def create_index_online(index_name: str, table_name: str, columns: List[str], unique: bool = False, **kw):
+    """Create an index without blocking writes on large, live tables.
+
+    On PostgreSQL this runs CREATE INDEX CONCURRENTLY outside the migration
+    transaction. Other databases get a plain CREATE INDEX. Existing indexes are
+    skipped so a migration interrupted halfway can simply be re-run.
+    """
+    if index_name in _existing_indexes(table_name):
+        return
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(index_name, table_name, columns, unique=unique, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(index_name, table_name, columns, unique=unique, **kw)
+
+def drop_index_online(index_name: str, table_name: str):
+    """Drop an index without taking an exclusive lock on PostgreSQL"""
+    if index_name not in _existing_indexes(table_name):
+        return
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+    else:
+        op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,85 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
+from app.core.config import settings
+from app.core.revocation import ensure_not_revoked
+from app.core.security import decode_token
+from app.models.user import User
+from app.utils.cache import cache_service
+
+class Principal:
+    """The authenticated user as most endpoints need it: identity, not the full row"""
+
+    __slots__ = ("id", "username", "is_active")
+
+    def __init__(self, id: int, username: str, is_active: bool = True):
+        self.id = id
+        self.username = username
+        self.is_active = is_active
+
+    def __repr__(self):
+        return f"Principal(id={self.id}, username={self.username!r})"
+
+def principal_claims(user: User) -> dict:
+    """Extra access-token claims that let requests authenticate without any lookup"""
+    if not settings.AUTH_TOKEN_CLAIMS:
+        return {}
+    return {"username": user.username, "active": user.is_active}
+
+class PrincipalCache:
+    """Short-TTL cache of principals by user id, in cache_service (L1 + Redis).
+
+    Entries carry the user:<id> tag, so profile updates and deactivation (any
+    committed change to the User row) drop them on every worker.
+    """
+
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl_seconds = ttl_seconds
+
+    async def resolve(self, claims: dict, db: Session) -> Principal:
+        """The principal for verified token claims; raises like get_current_user always has"""
+        user_id = int(claims["sub"])
+        if settings.AUTH_TOKEN_CLAIMS and "username" in claims:
+            principal = Principal(user_id, claims["username"], claims.get("active", True))
+        else:
+            principal = await self.get(user_id, db)
+
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        if not principal.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Inactive user"
+            )
+        return principal
+
+    async def get(self, user_id: int, db: Session) -> Optional[Principal]:
+        key = f"principal:{user_id}"
+        data = await cache_service.get(key)
+        if data is None:
+            user = db.query(User.id, User.username, User.is_active).filter(User.id == user_id).first()
+            if not user:
+                return None
+            data = {"id": user.id, "username": user.username, "is_active": bool(user.is_active)}
+            await cache_service.set(key, data, self.ttl_seconds, tags=[f"user:{user_id}"])
+        return Principal(**data)
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+async def authenticate(connection: HTTPConnection, token: str, db: Session) -> Principal:
+    """The one way a request or websocket handshake is authenticated.
+
+    The principal is kept on connection.state, so every dependency and handler
+    of the same request shares a single token decode and principal lookup.
+    """
+    principal = getattr(connection.state, "principal", None)
+    if principal is None:
+        claims = decode_token(token)
+        await ensure_not_revoked(claims)
+        principal = await principal_cache.resolve(claims, db)
+        connection.state.principal = principal
+    return principal
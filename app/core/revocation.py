@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import math
+import time
+from typing import Dict, Optional, Set
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.utils.cache import cache_service
+
+REVOKED_KEY = "auth:revoked"
+REVOKED_CHANNEL = "auth:revoked"
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, error_rate false positives"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, step = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class TokenRevocationList:
+    """Revoked token and session ids (jti / sid claims), screened by an in-process Bloom filter.
+
+    revoke() stores the id in a Redis sorted set scored by its expiry and
+    publishes it; every worker adds published ids to its filter as the message
+    arrives. A request whose ids miss the filter costs a few hashes and no I/O.
+    A possible hit is confirmed by one ZMSCORE in Redis, since the filter has
+    false positives; if Redis cannot answer, the token is treated as revoked.
+
+    The filter is rebuilt from Redis at startup, after the listener reconnects
+    (messages may have been missed) and every TOKEN_REVOCATION_REBUILD_SECONDS,
+    which drops expired ids. Ids revoked while Redis was down are kept
+    in-process and written once it is back.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._pending: Dict[str, float] = {}
+        self._added: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+
+    async def is_revoked(self, *ids: Optional[str]) -> bool:
+        candidates = [revoked_id for revoked_id in ids if revoked_id is not None and revoked_id in self._filter]
+        if not candidates:
+            return False
+
+        now = time.time()
+        if any(self._pending.get(revoked_id, 0) > now for revoked_id in candidates):
+            return True
+        scores = await cache_service.run(lambda client: client.zmscore(REVOKED_KEY, candidates))
+        if scores is None:
+            return True
+        return any(score is not None and score > now for score in scores)
+
+    async def revoke(self, revoked_id: str, exp: float):
+        """Reject tokens carrying this jti or sid until exp"""
+        self._add(revoked_id)
+        if not await self._write({revoked_id: exp}):
+            print(f"Redis not available, revocation of {revoked_id} is kept on this worker until it is back")
+            self._pending[revoked_id] = exp
+
+    async def _write(self, revoked: Dict[str, float]) -> bool:
+        def write(client):
+            pipe = client.pipeline(transaction=True)
+            pipe.zadd(REVOKED_KEY, revoked)
+            pipe.zremrangebyscore(REVOKED_KEY, "-inf", time.time())
+            for revoked_id in revoked:
+                pipe.publish(REVOKED_CHANNEL, revoked_id)
+            return pipe.execute()
+
+        return await cache_service.run(write) is not None
+
+    def _add(self, revoked_id: str):
+        self._filter.add(revoked_id)
+        self._added.add(revoked_id)
+
+    def on_message(self, revoked_id: Optional[str]):
+        if revoked_id is not None:
+            self._add(revoked_id)
+            return
+        task = asyncio.get_running_loop().create_task(self.rebuild())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def rebuild(self):
+        """Replace the filter with one built from the ids in Redis that have not expired"""
+        now = time.time()
+        self._pending = {revoked_id: exp for revoked_id, exp in self._pending.items() if exp > now}
+        if self._pending and await self._write(self._pending):
+            self._pending = {}
+
+        self._added = set()
+        revoked = await cache_service.run(lambda client: client.zrangebyscore(REVOKED_KEY, now, "+inf"))
+        if revoked is None:
+            return
+        bloom = BloomFilter(max(self.capacity, 2 * len(revoked)), self.error_rate)
+        # Ids published while Redis was being read are not lost by the swap
+        for revoked_id in [*(item.decode() for item in revoked), *self._pending, *self._added]:
+            bloom.add(revoked_id)
+        self._filter = bloom
+
+    async def start(self):
+        await self.rebuild()
+        self._task = asyncio.create_task(self._rebuild_periodically())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _rebuild_periodically(self):
+        while True:
+            await asyncio.sleep(settings.TOKEN_REVOCATION_REBUILD_SECONDS)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"Token revocation rebuild failed: {e!r}")
+
+revoked_tokens = TokenRevocationList(settings.TOKEN_REVOCATION_CAPACITY, settings.TOKEN_REVOCATION_ERROR_RATE)
+cache_service.subscribe(REVOKED_CHANNEL, revoked_tokens.on_message)
+
+async def ensure_not_revoked(claims: dict):
+    """Reject a token that was revoked itself or whose login session was (logout)"""
+    if await revoked_tokens.is_revoked(claims.get("jti"), claims.get("sid")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,18 +1,109 @@
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import argon2
 from fastapi import HTTPException, status
 from .config import settings
+from app.utils.cache import LocalCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_password_context(schemes: List[str], bcrypt_rounds: int = 12, argon2_time_cost: int = 3,
+                           argon2_memory_cost: int = 65536, argon2_parallelism: int = 1) -> CryptContext:
+    """The first scheme hashes new passwords; the rest (and weaker cost settings) are upgraded on login"""
+    if "argon2" in schemes and not argon2.has_backend():
+        print("argon2-cffi is not installed, argon2 password hashing disabled")
+        schemes = [scheme for scheme in schemes if scheme != "argon2"] or ["bcrypt"]
+
+    options = {}
+    if "bcrypt" in schemes:
+        options["bcrypt__rounds"] = bcrypt_rounds
+    if "argon2" in schemes:
+        options.update(
+            argon2__type="ID",
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+pwd_context = build_password_context(
+    settings.PASSWORD_HASH_SCHEMES,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.ARGON2_PARALLELISM
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and, if its hash is outdated (needs_update), return a fresh hash to store"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class PasswordHasherPool:
+    """Runs password hashing and verification on a small dedicated thread pool.
+
+    bcrypt and argon2 release the GIL, so the event loop keeps serving other requests
+    while a login is being checked. At most max_pending jobs may be queued or
+    running; beyond that callers get a 503 right away instead of piling up.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        # Jobs finish on pool threads, so the counters are shared with them
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            saturated = self._pending >= self.max_pending
+            if saturated:
+                self.rejected += 1
+            else:
+                self._pending += 1
+        if saturated:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        future = self._executor.submit(func, *args)
+        # Count the job until its thread is done, even if the request is cancelled first
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "queued": max(0, self._pending - self.workers),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+password_hasher = PasswordHasherPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -20,18 +111,53 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+# Claims of tokens whose signature was already checked, keyed by SHA-256 of the token
+_verified_tokens = LocalCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def forget_token(token: str):
+    """Drop a token from this worker's verified-token cache"""
+    _verified_tokens.delete(_token_digest(token))
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verified claims of a token of the given type ("access" or "refresh") that names a user.
+
+    Repeated tokens skip signature verification: their claims are served from
+    an LRU until exp. The claims dict is shared and must not be modified.
+    Callers check revocation with revocation.ensure_not_revoked, which applies
+    to cached tokens too.
+    """
+    digest = _token_digest(token)
+    claims = _verified_tokens.get(digest)
+    if claims is None:
+        claims = _verify_token_signature(token)
+        remaining = claims["exp"] - time.time() if "exp" in claims else None
+        if remaining is None or remaining > 0:
+            _verified_tokens.set(digest, claims, remaining)
+
+    # Tokens without a type predate refresh tokens being marked and are access tokens
+    if claims.get("type", "access") != token_type:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+def _verify_token_signature(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
@@ -41,10 +167,13 @@ def verify_token(token: str):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return user_id
+        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+def verify_token(token: str):
+    return decode_token(token)["sub"]
\ No newline at end of file
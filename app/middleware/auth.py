@@ -1,39 +1,14 @@
-from fastapi import Request, HTTPException, status
+from fastapi import Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.core.security import verify_token
-from app.core.database import SessionLocal
-from app.models.user import User
+from app.core.principal import Principal, authenticate
 
 class AuthMiddleware:
     def __init__(self):
         self.security = HTTPBearer()
     
-    async def get_current_user(self, credentials: HTTPAuthorizationCredentials, db: Session) -> User:
-        """Get current authenticated user"""
-        try:
-            user_id = verify_token(credentials.credentials)
-            user = db.query(User).filter(User.id == int(user_id)).first()
-            
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="User not found"
-                )
-            
-            if not user.is_active:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Inactive user"
-                )
-            
-            return user
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+    async def get_current_user(self, request: Request, credentials: HTTPAuthorizationCredentials, db: Session) -> Principal:
+        """Get current authenticated user (shared with users.get_current_user for the same request)"""
+        return await authenticate(request, credentials.credentials, db)
 
-auth_middleware = AuthMiddleware()
\ No newline at end of file
+auth_middleware = AuthMiddleware()
@@ -1,53 +1,198 @@
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+import ipaddress
+import math
+import re
 import time
-from collections import defaultdict, deque
-from typing import Dict, Deque
+from collections import OrderedDict
+from typing import Optional
+from app.core.config import settings
+from app.core.security import decode_token
+from app.utils.cache import cache_service
+
+# GCRA: the key holds the theoretical arrival time (TAT, ms) of the next request.
+# A request is allowed while TAT - now <= window - interval, and pushes TAT on by
+# one interval (window / requests). Redis' own clock keeps all workers consistent,
+# and the key expires once TAT has passed, i.e. when the key is idle.
+# Returns {allowed, remaining, retry_after_ms, reset_ms}.
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+if tat - now > tolerance then
+    return {0, 0, tat - now - tolerance, tat - now}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, math.floor((tolerance + interval - (new_tat - now)) / interval), 0, new_tat - now}
+"""
+
+_TRUSTED_PROXIES = [ipaddress.ip_network(network, strict=False) for network in settings.TRUSTED_PROXIES]
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXIES)
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset: float, retry_after: float = 0):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset  # seconds until the full limit is available again
+        self.retry_after = retry_after
 
 class RateLimiter:
-    def __init__(self):
-        self.requests: Dict[str, Deque[float]] = defaultdict(deque)
+    def __init__(self, max_local_keys: int = settings.RATE_LIMIT_LOCAL_MAX_KEYS):
+        # In-process fallback: one GCRA arrival time per "limit_type:key", least recently used first
+        self.arrivals: "OrderedDict[str, float]" = OrderedDict()
+        self.max_local_keys = max_local_keys
         self.limits = {
             "auth": {"requests": 5, "window": 60},  # 5 requests per minute for auth
             "api": {"requests": 100, "window": 60},  # 100 requests per minute for API
             "sync": {"requests": 10, "window": 300}  # 10 sync requests per 5 minutes
         }
     
-    def is_allowed(self, key: str, limit_type: str = "api") -> bool:
-        """Check if request is allowed based on rate limits"""
-        now = time.time()
+    async def check(self, key: str, limit_type: str = "api") -> RateLimitResult:
+        """Count a request against the cluster-wide limit in Redis (one round-trip).
+
+        Falls back to this worker's own counters while Redis is unavailable.
+        """
         limit_config = self.limits.get(limit_type, self.limits["api"])
+        if settings.RATE_LIMIT_REDIS:
+            interval = math.ceil(limit_config["window"] * 1000 / limit_config["requests"])
+            result = await cache_service.run(lambda client: client.eval(
+                _GCRA_SCRIPT, 1, f"ratelimit:{limit_type}:{key}",
+                interval, limit_config["window"] * 1000 - interval
+            ))
+            if result is not None:
+                allowed, remaining, retry_after_ms, reset_ms = result
+                return RateLimitResult(
+                    bool(allowed), limit_config["requests"], int(remaining),
+                    reset_ms / 1000, retry_after_ms / 1000
+                )
+        return self.check_locally(key, limit_type)
+    
+    def check_locally(self, key: str, limit_type: str = "api") -> RateLimitResult:
+        """The same GCRA as the Redis script, in O(1) time and one float per active key"""
+        limit_config = self.limits.get(limit_type, self.limits["api"])
+        interval = limit_config["window"] / limit_config["requests"]
+        tolerance = limit_config["window"] - interval
+        bucket = f"{limit_type}:{key}"
+        now = time.monotonic()
         
-        # Clean old requests outside the window
-        while (self.requests[key] and 
-               now - self.requests[key][0] > limit_config["window"]):
-            self.requests[key].popleft()
-        
-        # Check if under limit
-        if len(self.requests[key]) < limit_config["requests"]:
-            self.requests[key].append(now)
-            return True
+        arrival = max(self.arrivals.get(bucket, now), now)
+        if arrival - now > tolerance:
+            self.arrivals.move_to_end(bucket)
+            return RateLimitResult(
+                False, limit_config["requests"], 0, arrival - now, arrival - now - tolerance
+            )
         
-        return False
+        arrival += interval
+        self.arrivals[bucket] = arrival
+        self.arrivals.move_to_end(bucket)
+        self._evict(now)
+        remaining = math.floor((tolerance + interval - (arrival - now)) / interval + 1e-9)
+        return RateLimitResult(True, limit_config["requests"], remaining, arrival - now)
+    
+    def _evict(self, now: float):
+        # Keys whose arrival time has passed are idle (a fresh key behaves the same),
+        # and beyond max_local_keys the least recently used go first
+        while self.arrivals:
+            bucket, arrival = next(iter(self.arrivals.items()))
+            if arrival > now and len(self.arrivals) <= self.max_local_keys:
+                break
+            del self.arrivals[bucket]
+    
+    def is_allowed(self, key: str, limit_type: str = "api") -> bool:
+        """Check if request is allowed based on rate limits"""
+        return self.check_locally(key, limit_type).allowed
     
     def get_client_ip(self, request: Request) -> str:
-        """Get client IP address"""
+        """Get client IP address.
+
+        X-Forwarded-For is only believed when the peer is one of
+        TRUSTED_PROXIES; then the client is the rightmost address that is not a
+        trusted proxy (anything left of it could have been sent by the client).
+        """
+        peer = request.client.host if request.client else "unknown"
         forwarded = request.headers.get("X-Forwarded-For")
-        if forwarded:
-            return forwarded.split(",")[0].strip()
-        return request.client.host
+        if not forwarded or not _is_trusted_proxy(peer):
+            return peer
+        for address in reversed([address.strip() for address in forwarded.split(",")]):
+            if not _is_trusted_proxy(address):
+                return address
+        return peer
 
 rate_limiter = RateLimiter()
 
-async def rate_limit_middleware(request: Request, call_next, limit_type: str = "api"):
-    """Rate limiting middleware"""
-    client_ip = rate_limiter.get_client_ip(request)
-    
-    if not rate_limiter.is_allowed(client_ip, limit_type):
-        return JSONResponse(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            content={"detail": "Rate limit exceeded. Please try again later."}
-        )
-    
-    response = await call_next(request)
-    return response
\ No newline at end of file
+# (method, path pattern, limit type): the first match wins, any other API request is "api"
+RATE_LIMIT_POLICIES = [
+    ("POST", re.compile(r"^/api/v1/auth/(login|register)$"), "auth"),
+    ("POST", re.compile(r"^/api/v1/playlists/[^/]+/sync$"), "sync"),
+]
+
+def rate_limit_headers(result: RateLimitResult) -> dict:
+    return {
+        "RateLimit-Limit": str(result.limit),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(math.ceil(result.reset)),
+    }
+
+class RateLimitMiddleware:
+    """ASGI rate limiting, applied before the body is read or any dependency runs.
+
+    Requests are counted per user id when they carry a valid bearer token
+    (checked through the verified-token cache, no database) and per client IP
+    otherwise. Every limited response gets RateLimit-* headers.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        limit_type = self.policy_for(scope) if settings.RATE_LIMIT_ENABLED else None
+        if limit_type is None:
+            await self.app(scope, receive, send)
+            return
+
+        result = await self.limiter.check(self.client_key(Request(scope)), limit_type)
+        headers = rate_limit_headers(result)
+        if not result.allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded. Please try again later."},
+                headers={**headers, "Retry-After": str(math.ceil(result.retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def policy_for(self, scope) -> Optional[str]:
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return None
+        for method, pattern, limit_type in RATE_LIMIT_POLICIES:
+            if scope["method"] == method and pattern.match(scope["path"]):
+                return limit_type
+        return "api"
+
+    def client_key(self, request: Request) -> str:
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            try:
+                return f"user:{decode_token(authorization[7:])['sub']}"
+            except HTTPException:
+                pass
+        return f"ip:{self.limiter.get_client_ip(request)}"
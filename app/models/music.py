@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Playlist(Base):
     __tablename__ = "playlists"
+    __table_args__ = (
+        Index("ix_playlists_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -56,6 +59,9 @@ class Track(Base):
 
 class PlaylistTrack(Base):
     __tablename__ = "playlist_tracks"
+    __table_args__ = (
+        Index("ix_playlist_tracks_playlist_id_position", "playlist_id", "position"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     playlist_id = Column(Integer, ForeignKey("playlists.id"), nullable=False)
@@ -73,6 +79,10 @@ class PlaylistTrack(Base):
 
 class UserFavorite(Base):
     __tablename__ = "user_favorites"
+    __table_args__ = (
+        Index("ix_user_favorites_user_id_track_id", "user_id", "track_id"),
+        Index("ix_user_favorites_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -88,6 +98,9 @@ class UserFavorite(Base):
 
 class TrendingTrack(Base):
     __tablename__ = "trending_tracks"
+    __table_args__ = (
+        Index("ix_trending_tracks_rank", "rank"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -24,10 +24,12 @@ class User(Base):
     # Relationships
     music_accounts = relationship("MusicAccount", back_populates="user")
     playlists = relationship("Playlist", back_populates="user")
-    friendships = relationship("Friendship", foreign_keys="Friendship.user_id", back_populates="user")
 
 class MusicAccount(Base):
     __tablename__ = "music_accounts"
+    __table_args__ = (
+        Index("ix_music_accounts_user_id_platform", "user_id", "platform"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -50,11 +52,22 @@ class MusicAccount(Base):
     user = relationship("User", back_populates="music_accounts")
 
 class Friendship(Base):
+    """One row per pair of users, stored with the smaller id first.
+
+    requester_id records who sent the request, so the direction of a pending
+    request survives the canonical ordering.
+    """
     __tablename__ = "friendships"
+    __table_args__ = (
+        Index("ux_friendships_pair", "user_low_id", "user_high_id", unique=True),
+        Index("ix_friendships_user_low_id_status_id", "user_low_id", "status", "id"),
+        Index("ix_friendships_user_high_id_status_id", "user_high_id", "status", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    friend_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_low_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_high_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     status = Column(String, default="pending")  # 'pending', 'accepted', 'blocked'
     
     # Timestamps
@@ -62,5 +75,12 @@ class Friendship(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", foreign_keys=[user_id])
-    friend = relationship("User", foreign_keys=[friend_id])
\ No newline at end of file
+    requester = relationship("User", foreign_keys=[requester_id])
+    
+    @staticmethod
+    def pair(user_id: int, other_user_id: int):
+        """Canonical (low, high) ordering of two user ids"""
+        return (user_id, other_user_id) if user_id < other_user_id else (other_user_id, user_id)
+    
+    def other_user_id(self, user_id: int) -> int:
+        return self.user_high_id if self.user_low_id == user_id else self.user_low_id
\ No newline at end of file
@@ -59,6 +59,11 @@ class PlaylistTrackAdd(BaseModel):
     track_id: int
     position: Optional[int] = None
 
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    type: str  # 'track', 'artist' or 'album'
+    track_id: Optional[int] = None
+
 class TrendingTrackResponse(BaseModel):
     track: TrackResponse
     rank: int
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -55,6 +55,19 @@ class MusicAccountResponse(MusicAccountBase):
 class FriendshipRequest(BaseModel):
     friend_email: EmailStr
 
+class NowPlaying(BaseModel):
+    """A track a user reports over the WebSocket; shown to their friends as is"""
+    title: str = Field(min_length=1, max_length=200)
+    artist: Optional[str] = Field(default=None, max_length=200)
+    album: Optional[str] = Field(default=None, max_length=200)
+    platform: Optional[str] = Field(default=None, max_length=20)
+    track_id: Optional[str] = Field(default=None, max_length=100)
+    cover_image_url: Optional[str] = Field(default=None, max_length=500)
+    duration_ms: Optional[int] = Field(default=None, ge=0, le=24 * 60 * 60 * 1000)
+    
+    class Config:
+        extra = "forbid"
+
 class FriendshipResponse(BaseModel):
     id: int
     friend_id: int
@@ -63,6 +76,25 @@ class FriendshipResponse(BaseModel):
     friend_avatar_url: Optional[str] = None
     status: str
     created_at: datetime
+    # Only filled when requested with ?include=presence,now_playing
+    is_online: Optional[bool] = None
+    now_playing: Optional[NowPlaying] = None
+    
+    class Config:
+        from_attributes = True
+
+class UserSummary(BaseModel):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FriendSuggestion(UserSummary):
+    mutual_count: int
+
+class FriendCountResponse(BaseModel):
+    user_id: int
+    friend_count: int
\ No newline at end of file
@@ -5,9 +5,12 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from pathlib import Path
 from app.core.config import settings
+from app.services.outbound_quota import outbound_quota
 
 class AppleMusicService:
-    def __init__(self):
+    def __init__(self, user_id: Optional[int] = None):
+        # The app user whose share of the outbound quota these calls count against
+        self.user_id = user_id
         self.team_id = settings.APPLE_MUSIC_TEAM_ID
         self.key_id = settings.APPLE_MUSIC_KEY_ID
         self.base_url = "https://api.music.apple.com/v1"
@@ -30,6 +33,11 @@ class AppleMusicService:
                 self.private_key = None
                 self.demo_mode = True
     
+    async def _request(self, method: str, endpoint_class: str, url: str, **kwargs) -> requests.Response:
+        """Send one API request once the user's share of the app-wide quota allows it"""
+        await outbound_quota.acquire("apple_music", self.user_id, endpoint_class)
+        return requests.request(method, url, **kwargs)
+    
     def _load_private_key(self) -> str:
         """Load private key from settings or file"""
         if settings.APPLE_MUSIC_PRIVATE_KEY:
@@ -97,7 +105,7 @@ class AppleMusicService:
             "Music-User-Token": user_token
         }
         
-        response = requests.get(f"{self.base_url}/me/storefront", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/me/storefront", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -111,7 +119,7 @@ class AppleMusicService:
             "Music-User-Token": user_token
         }
         
-        response = requests.get(f"{self.base_url}/me/library/playlists", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/me/library/playlists", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -127,7 +135,7 @@ class AppleMusicService:
             "limit": limit
         }
         
-        response = requests.get(f"{self.base_url}/catalog/us/search", headers=headers, params=params)
+        response = await self._request("GET", "search", f"{self.base_url}/catalog/us/search", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -150,7 +158,7 @@ class AppleMusicService:
             "type": "library-playlists"
         }
         
-        response = requests.post(f"{self.base_url}/me/library/playlists", headers=headers, json={"data": [data]})
+        response = await self._request("POST", "write", f"{self.base_url}/me/library/playlists", headers=headers, json={"data": [data]})
         response.raise_for_status()
         
         return response.json()
@@ -164,7 +172,7 @@ class AppleMusicService:
             "Music-User-Token": user_token
         }
         
-        response = requests.get(f"{self.base_url}/me/storefront", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/me/storefront", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -178,7 +186,7 @@ class AppleMusicService:
             "Music-User-Token": user_token
         }
         
-        response = requests.get(
+        response = await self._request("GET", "read",
             f"{self.base_url}/me/library/playlists/{playlist_id}/tracks", 
             headers=headers
         )
@@ -205,7 +213,7 @@ class AppleMusicService:
             ]
         }
         
-        response = requests.post(
+        response = await self._request("POST", "write",
             f"{self.base_url}/me/library/playlists/{playlist_id}/tracks",
             headers=headers,
             json=data
@@ -220,7 +228,7 @@ class AppleMusicService:
         
         headers = {"Authorization": f"Bearer {developer_token}"}
         
-        response = requests.get(
+        response = await self._request("GET", "read",
             f"{self.base_url}/catalog/{storefront}/songs/{song_id}",
             headers=headers
         )
@@ -239,7 +247,7 @@ class AppleMusicService:
             "limit": limit
         }
         
-        response = requests.get(
+        response = await self._request("GET", "search",
             f"{self.base_url}/catalog/{storefront}/search",
             headers=headers,
             params=params
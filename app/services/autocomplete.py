@@ -0,0 +1,230 @@
+import heapq
+import json
+import os
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.music import Track
+
+MAX_SUGGESTIONS = 20
+SNAPSHOT_VERSION = 1
+# Prefixes this short match a large slice of the catalog, so their results are memoized
+MEMO_PREFIX_LENGTH = 2
+# Up to this many new keys are inserted one by one; larger batches are merged in one pass
+INSERT_MAX_KEYS = 32
+
+def normalize(value: str) -> str:
+    """Case-fold, strip accents and collapse whitespace so 'Beyoncé ' matches 'beyonce'"""
+    if not value.isascii():
+        value = unicodedata.normalize("NFKD", value)
+        value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return " ".join(value.casefold().split())
+
+class AutocompleteIndex:
+    """In-memory prefix index over track titles, artists and albums.
+
+    Keys are kept in a sorted list so a prefix maps to a contiguous slice found
+    with two bisects. Every word start of a name is indexed, so "weeknd" finds
+    "The Weeknd". Suggestions are ranked by Track.popularity (for artists and
+    albums, the best popularity among their tracks).
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self.last_track_id = 0
+        self._keys: List[str] = []
+        self._key_entries: List[int] = []
+        # entry id -> [text, type, track_id, weight]
+        self._entries: List[list] = []
+        self._entry_ids: Dict[Tuple[str, str], int] = {}
+        self._memo: Dict[str, List[dict]] = {}
+        self._refreshed_at = 0.0
+
+    def add_track(self, track_id: int, title: str, artist: str, album: Optional[str], popularity: Optional[int]):
+        """Index one track incrementally.
+
+        The catch-up watermark is left alone: other workers may still commit
+        lower ids, and refresh() re-reading this track is harmless.
+        """
+        self.add_tracks([(track_id, title, artist, album, popularity)])
+
+    def add_tracks(self, rows: List[tuple]):
+        """add_track for a batch of (track_id, title, artist, album, popularity) rows"""
+        self._add_many(rows, advance_watermark=False)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Top suggestions whose name (or one of its words) starts with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        limit = min(limit, MAX_SUGGESTIONS)
+        if len(prefix) <= MEMO_PREFIX_LENGTH:
+            if prefix not in self._memo:
+                self._memo[prefix] = self._top(prefix, MAX_SUGGESTIONS)
+            return self._memo[prefix][:limit]
+
+        return self._top(prefix, limit)
+
+    def load(self, db: Session):
+        """Restore the snapshot if there is one, then index tracks added since it was taken"""
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                self._restore(self.snapshot_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Autocomplete snapshot unreadable, rebuilding: {e}")
+                self._reset()
+
+        self._catch_up(db)
+        self.loaded = True
+
+    def refresh(self, db: Session):
+        """Load the index on first use, then pick up tracks inserted by other workers"""
+        if not self.loaded:
+            self.load(db)
+        elif time.monotonic() - self._refreshed_at >= settings.AUTOCOMPLETE_REFRESH_SECONDS:
+            self._catch_up(db)
+
+    def _catch_up(self, db: Session):
+        query = db.query(
+            Track.id, Track.title, Track.artist, Track.album, Track.popularity
+        ).filter(Track.id > self.last_track_id).order_by(Track.id)
+        self._add_many(query.yield_per(5000), advance_watermark=True)
+        self._refreshed_at = time.monotonic()
+
+    def save(self):
+        """Write the index to disk atomically for fast startup of the next worker"""
+        if not self.snapshot_path:
+            return
+
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "last_track_id": self.last_track_id,
+                "keys": self._keys,
+                "key_entries": self._key_entries,
+                "entries": self._entries,
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _restore(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        if data["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {data['version']}")
+
+        self.last_track_id = data["last_track_id"]
+        self._keys = data["keys"]
+        self._key_entries = data["key_entries"]
+        self._entries = data["entries"]
+        self._entry_ids = {}
+        for entry_id, (text, kind, track_id, _) in enumerate(self._entries):
+            key = str(track_id) if kind == "track" else normalize(text)
+            self._entry_ids[(kind, key)] = entry_id
+        self._memo.clear()
+
+    def _top(self, prefix: str, limit: int) -> List[dict]:
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + "\uffff", start)
+        # Several word starts of one name can share the prefix; rank each entry once
+        entry_ids = set(self._key_entries[start:end])
+        best = heapq.nlargest(limit, entry_ids, key=lambda entry_id: self._entries[entry_id][3])
+        return [
+            {"text": text, "type": kind, "track_id": track_id}
+            for text, kind, track_id, _ in (self._entries[entry_id] for entry_id in best)
+        ]
+
+    def _add_many(self, rows, advance_watermark: bool):
+        new_pairs = []
+        changed = False
+        for track_id, title, artist, album, popularity in rows:
+            changed = True
+            weight = popularity or 0
+            for kind, text, entry_track_id in (
+                ("track", title, track_id),
+                ("artist", artist, None),
+                ("album", album, None),
+            ):
+                if not text:
+                    continue
+                normalized = normalize(text)
+                entry_key = (kind, str(entry_track_id)) if kind == "track" else (kind, normalized)
+                entry_id = self._entry_ids.get(entry_key)
+                if entry_id is not None:
+                    entry = self._entries[entry_id]
+                    entry[3] = max(entry[3], weight)
+                    continue
+
+                entry_id = len(self._entries)
+                self._entries.append([text, kind, entry_track_id, weight])
+                self._entry_ids[entry_key] = entry_id
+                new_pairs.extend((key, entry_id) for key in self._word_starts(normalized))
+            if advance_watermark:
+                self.last_track_id = max(self.last_track_id, track_id)
+
+        self._merge(new_pairs)
+        if changed:
+            self._memo.clear()
+
+    def _merge(self, new_pairs: List[Tuple[str, int]]):
+        """Add (key, entry_id) pairs to the sorted key lists.
+
+        A large batch is sorted and merged in one pass that copies the existing
+        lists slice by slice, O(n + k log k), instead of k list inserts of O(n).
+        """
+        new_pairs.sort()
+        if len(new_pairs) <= INSERT_MAX_KEYS:
+            for key, entry_id in new_pairs:
+                position = bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._key_entries.insert(position, entry_id)
+            return
+
+        keys: List[str] = []
+        key_entries: List[int] = []
+        previous = 0
+        for key, entry_id in new_pairs:
+            position = bisect_left(self._keys, key, previous)
+            keys += self._keys[previous:position]
+            key_entries += self._key_entries[previous:position]
+            keys.append(key)
+            key_entries.append(entry_id)
+            previous = position
+        keys += self._keys[previous:]
+        key_entries += self._key_entries[previous:]
+        self._keys, self._key_entries = keys, key_entries
+
+    def _word_starts(self, normalized: str) -> List[str]:
+        words = normalized.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+autocomplete_index = AutocompleteIndex(settings.AUTOCOMPLETE_SNAPSHOT_PATH)
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_tracks(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Track):
+            session.info.setdefault("autocomplete_tracks", []).append(
+                (obj.id, obj.title, obj.artist, obj.album, obj.popularity)
+            )
+
+@event.listens_for(Session, "after_commit")
+def _index_committed_tracks(session):
+    # Only committed tracks reach the index; values were captured at flush time
+    # because no SQL can be emitted from after_commit
+    rows = session.info.pop("autocomplete_tracks", [])
+    if rows and autocomplete_index.loaded:
+        autocomplete_index.add_tracks(rows)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_tracks(session):
+    session.info.pop("autocomplete_tracks", None)
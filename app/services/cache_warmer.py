@@ -0,0 +1,159 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.cache import cache_service
+
+HITS_KEY = "cache:warm:hits"
+
+def hits_key(interval: int) -> str:
+    """Sorted set of hits counted during one warm interval (time // CACHE_WARM_INTERVAL_SECONDS)"""
+    return f"{HITS_KEY}:{interval}"
+
+class WarmTarget:
+    def __init__(self, name: str, producer: Callable[..., Awaitable[Any]], expire: int,
+                 stale_ttl: int = 0, tags: Tuple[str, ...] = (), parameterized: bool = False):
+        self.name = name
+        self.producer = producer
+        self.expire = expire
+        self.stale_ttl = stale_ttl
+        self.tags = tags
+        self.parameterized = parameterized
+
+    def key(self, args: tuple) -> str:
+        return ":".join([self.name, *map(str, args)])
+
+class CacheWarmer:
+    """Registry of hot cache entries that are precomputed before users ask for them.
+
+    Endpoints read registered entries through get(), which counts every access.
+    Each run (at startup, then every CACHE_WARM_INTERVAL_SECONDS) adds this
+    worker's counts to a Redis sorted set shared by all workers, one per
+    interval, then refreshes the entries most requested during the previous
+    interval first. The sets outlive restarts for one more interval, so a
+    fresh deploy warms whatever was hot in the previous process. Entries with
+    arguments (e.g. one per playlist) are warmed for the CACHE_WARM_MAX_KEYS
+    most requested argument tuples only.
+    """
+
+    def __init__(self):
+        self._targets: Dict[str, WarmTarget] = {}
+        self._hits: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, producer: Callable[..., Awaitable[Any]], expire: int,
+                 stale_ttl: int = 0, tags: Tuple[str, ...] = (), parameterized: bool = False):
+        """Register a producer; tags are format strings over its arguments, e.g. "playlist:{0}" """
+        self._targets[name] = WarmTarget(name, producer, expire, stale_ttl, tuple(tags), parameterized)
+
+    async def get(self, name: str, *args, record: bool = True) -> Any:
+        """Get a registered entry through cache_service.get_or_compute, counting the access.
+
+        Producers return None for things that do not exist; such misses are
+        neither cached nor counted, so probing ids cannot fill the warm plan.
+        Endpoints that still authorize the value pass record=False and call
+        record_hit() once the caller may see it.
+        """
+        target = self._targets[name]
+        value = await cache_service.get_or_compute(
+            target.key(args), lambda: target.producer(*args), target.expire,
+            stale_ttl=target.stale_ttl, tags=[tag.format(*args) for tag in target.tags]
+        )
+        if value is not None and record:
+            self.record_hit(name, *args)
+        return value
+
+    def record_hit(self, name: str, *args):
+        self._hits[json.dumps([name, *args])] += 1
+
+    async def start(self):
+        """Warm once, then keep warming in the background"""
+        await self.warm()
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def warm(self) -> List[str]:
+        """Refresh registered entries, most requested first; returns the keys written"""
+        warmed = []
+        for target, args in await self._plan():
+            key = target.key(args)
+            try:
+                written = await cache_service.refresh(
+                    key, lambda: target.producer(*args), target.expire,
+                    stale_ttl=target.stale_ttl,
+                    tags=[tag.format(*args) for tag in target.tags],
+                    # Anything that would expire before the next run is refreshed now
+                    min_ttl=settings.CACHE_WARM_INTERVAL_SECONDS
+                )
+            except Exception as e:
+                print(f"Cache warm error for {key}: {e!r}")
+                continue
+            if written:
+                warmed.append(key)
+        return warmed
+
+    async def _plan(self) -> List[Tuple[WarmTarget, tuple]]:
+        hits = await self._shared_hits()
+        planned = {}
+        for field, count in hits.items():
+            name, *args = json.loads(field)
+            if name in self._targets:
+                planned[(name, tuple(args))] = count
+        for name, target in self._targets.items():
+            if not target.parameterized:
+                planned.setdefault((name, ()), 0)
+
+        ranked = sorted(planned.items(), key=lambda item: -item[1])
+        plan = []
+        parameterized_keys = 0
+        for (name, args), _ in ranked:
+            target = self._targets[name]
+            if target.parameterized:
+                if parameterized_keys >= settings.CACHE_WARM_MAX_KEYS:
+                    continue
+                parameterized_keys += 1
+            plan.append((target, args))
+        return plan
+
+    async def _shared_hits(self) -> Dict[str, int]:
+        """Top hits of the previous interval across all workers, after adding this worker's own"""
+        local, self._hits = self._hits, Counter()
+        interval = int(time.time() // settings.CACHE_WARM_INTERVAL_SECONDS)
+        top = settings.CACHE_WARM_MAX_KEYS + len(self._targets)
+
+        def exchange(client):
+            pipe = client.pipeline(transaction=False)
+            for field, count in local.items():
+                pipe.zincrby(hits_key(interval), count, field)
+            # Kept for the next interval's plan, then dropped
+            pipe.expire(hits_key(interval), 2 * settings.CACHE_WARM_INTERVAL_SECONDS)
+            pipe.zrevrange(hits_key(interval - 1), 0, top - 1, withscores=True)
+            return pipe.execute()
+
+        result = await cache_service.run(exchange)
+        if result is None:
+            # Redis is unavailable: rank by this worker's counts since its last run
+            return dict(local)
+        return {field.decode(): int(count) for field, count in result[-1]}
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(settings.CACHE_WARM_INTERVAL_SECONDS)
+            try:
+                warmed = await self.warm()
+                if warmed:
+                    print(f"Cache warmer refreshed {len(warmed)} entries")
+            except Exception as e:
+                print(f"Cache warm run failed: {e!r}")
+
+cache_warmer = CacheWarmer()
@@ -0,0 +1,122 @@
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import Friendship
+from app.utils.cache import cache_service
+from app.utils.loaders import MAX_BATCH_SIZE
+
+EDGES_CHANNEL = "friends:edges"
+
+class FriendGraph:
+    """In-memory adjacency index of accepted friendships.
+
+    Each user's friend ids are loaded lazily (one IN query for a whole batch of
+    users), kept in a size-bounded LRU, and patched in place when this worker
+    accepts or removes a friendship. The change is published on EDGES_CHANNEL
+    so other workers drop both users' entries; the TTL bounds staleness if a
+    message is missed.
+    """
+
+    def __init__(self, max_users: int = 100000, ttl_seconds: int = 300):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._adjacency: "OrderedDict[int, Tuple[float, Set[int]]]" = OrderedDict()
+
+    def friends_of(self, db: Session, user_id: int) -> FrozenSet[int]:
+        """Friend ids of one user (a snapshot: the cached set is patched in place)"""
+        return frozenset(self._ensure_loaded(db, [user_id])[user_id])
+
+    def friend_count(self, db: Session, user_id: int) -> int:
+        return len(self._ensure_loaded(db, [user_id])[user_id])
+
+    def mutual_friends(self, db: Session, user_id: int, other_user_id: int) -> List[int]:
+        """Friend ids the two users have in common"""
+        adjacency = self._ensure_loaded(db, [user_id, other_user_id])
+        return sorted(adjacency[user_id] & adjacency[other_user_id])
+
+    def suggestions(self, db: Session, user_id: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """Friends of friends who are not yet friends, as (user_id, mutual_count), most mutual first"""
+        friends = self.friends_of(db, user_id)
+        friends_of_friends = self._ensure_loaded(db, friends)
+
+        overlap = Counter()
+        for friend_id in friends:
+            overlap.update(friends_of_friends[friend_id])
+        overlap.pop(user_id, None)
+        for friend_id in friends:
+            overlap.pop(friend_id, None)
+
+        return sorted(overlap.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    async def add_edge(self, user_id: int, friend_id: int):
+        """Record an accepted friendship for users already in the index, on every worker"""
+        for a, b in ((user_id, friend_id), (friend_id, user_id)):
+            if a in self._adjacency:
+                self._adjacency[a][1].add(b)
+        await self._publish(user_id, friend_id)
+
+    async def remove_edge(self, user_id: int, friend_id: int):
+        """Forget a friendship for users already in the index, on every worker"""
+        for a, b in ((user_id, friend_id), (friend_id, user_id)):
+            if a in self._adjacency:
+                self._adjacency[a][1].discard(b)
+        await self._publish(user_id, friend_id)
+
+    def invalidate(self, user_id: int):
+        self._adjacency.pop(user_id, None)
+
+    async def _publish(self, user_id: int, friend_id: int):
+        message = f"{cache_service.instance_id}:{user_id},{friend_id}"
+        await cache_service.run(lambda client: client.publish(EDGES_CHANNEL, message))
+
+    def on_message(self, data: Optional[str]):
+        """An edge changed on some worker; None means messages may have been missed"""
+        if data is None:
+            self._adjacency.clear()
+            return
+        sender, _, user_ids = data.partition(":")
+        # Our own changes were patched in place
+        if sender == cache_service.instance_id:
+            return
+        for user_id in user_ids.split(","):
+            self.invalidate(int(user_id))
+
+    def _ensure_loaded(self, db: Session, user_ids: Iterable[int]) -> Dict[int, Set[int]]:
+        now = time.monotonic()
+        result = {}
+        missing = []
+        for user_id in set(user_ids):
+            entry = self._adjacency.get(user_id)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._adjacency.move_to_end(user_id)
+                result[user_id] = entry[1]
+            else:
+                missing.append(user_id)
+
+        if missing:
+            loaded = {user_id: set() for user_id in missing}
+            for start in range(0, len(missing), MAX_BATCH_SIZE):
+                batch = missing[start:start + MAX_BATCH_SIZE]
+                rows = db.query(Friendship.user_low_id, Friendship.user_high_id).filter(
+                    Friendship.user_low_id.in_(batch) | Friendship.user_high_id.in_(batch),
+                    Friendship.status == "accepted"
+                ).all()
+                # Each canonical edge fills in both endpoints that are being loaded
+                for user_low_id, user_high_id in rows:
+                    if user_low_id in loaded:
+                        loaded[user_low_id].add(user_high_id)
+                    if user_high_id in loaded:
+                        loaded[user_high_id].add(user_low_id)
+
+            for user_id, friend_ids in loaded.items():
+                self._adjacency[user_id] = (now, friend_ids)
+                result[user_id] = friend_ids
+            while len(self._adjacency) > self.max_users:
+                self._adjacency.popitem(last=False)
+
+        return result
+
+friend_graph = FriendGraph(settings.FRIEND_GRAPH_MAX_USERS, settings.FRIEND_GRAPH_TTL_SECONDS)
+cache_service.subscribe(EDGES_CHANNEL, friend_graph.on_message)
@@ -0,0 +1,91 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Session
+from app.models.user import User, Friendship
+from app.utils.pagination import paginate
+from app.websocket.manager import manager
+
+INCLUDE_OPTIONS = {"presence", "now_playing"}
+
+class FriendRepository:
+    """Friend listings as one joined column projection per page.
+
+    Rows are plain dicts shaped like FriendshipResponse, so no User or
+    Friendship objects are built and no per-row lookups are issued.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_between(self, user_id: int, other_user_id: int) -> Optional[Friendship]:
+        """The friendship row of a pair, whatever its status (unique index point lookup)"""
+        user_low_id, user_high_id = Friendship.pair(user_id, other_user_id)
+        return self.db.query(Friendship).filter(
+            Friendship.user_low_id == user_low_id,
+            Friendship.user_high_id == user_high_id
+        ).first()
+
+    def get_incoming_request(self, friendship_id: int, user_id: int) -> Optional[Friendship]:
+        """A pending request that someone else sent to user_id"""
+        friendship = self.db.query(Friendship).filter(
+            Friendship.id == friendship_id,
+            Friendship.status == "pending"
+        ).first()
+        if not friendship or friendship.requester_id == user_id:
+            return None
+        if user_id not in (friendship.user_low_id, friendship.user_high_id):
+            return None
+        return friendship
+
+    def list_friends(self, user_id: int, limit: int, cursor: Optional[str] = None,
+                     include: Optional[set] = None) -> Tuple[List[dict], Optional[str]]:
+        """Accepted friendships of user_id, oldest first"""
+        other_user_id = case(
+            (Friendship.user_low_id == user_id, Friendship.user_high_id),
+            else_=Friendship.user_low_id
+        )
+        query = self._projection(other_user_id).filter(
+            self._involves(user_id),
+            Friendship.status == "accepted"
+        )
+        return self._page(query, limit, cursor, include)
+
+    def list_incoming_requests(self, user_id: int, limit: int, cursor: Optional[str] = None,
+                               include: Optional[set] = None) -> Tuple[List[dict], Optional[str]]:
+        """Pending requests sent to user_id, oldest first"""
+        query = self._projection(Friendship.requester_id).filter(
+            self._involves(user_id),
+            Friendship.status == "pending",
+            Friendship.requester_id != user_id
+        )
+        return self._page(query, limit, cursor, include)
+
+    def _involves(self, user_id: int):
+        # Each side is served by its own (user_*_id, status, id) index
+        return or_(Friendship.user_low_id == user_id, Friendship.user_high_id == user_id)
+
+    def _projection(self, other_user_column):
+        return self.db.query(
+            Friendship.id,
+            Friendship.status,
+            Friendship.created_at,
+            User.id.label("friend_id"),
+            User.username.label("friend_username"),
+            User.full_name.label("friend_full_name"),
+            User.avatar_url.label("friend_avatar_url"),
+        ).join(User, other_user_column == User.id)
+
+    def _page(self, query, limit: int, cursor: Optional[str], include: Optional[set]):
+        rows, next_cursor = paginate(query, [(Friendship.id, False)], cursor, limit, lambda row: [row.id])
+        include = include or set()
+
+        friends = []
+        for row in rows:
+            friend = dict(row._mapping)
+            if "presence" in include:
+                friend["is_online"] = manager.is_online(row.friend_id)
+            if "now_playing" in include:
+                friend["now_playing"] = manager.get_now_playing(row.friend_id)
+            friends.append(friend)
+
+        return friends, next_cursor
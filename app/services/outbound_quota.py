@@ -0,0 +1,109 @@
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+from app.core.config import settings
+
+class QuotaExceeded(Exception):
+    def __init__(self, platform: str, retry_after: float):
+        super().__init__(f"{platform} request quota exhausted, retry after {math.ceil(retry_after)} seconds")
+        self.platform = platform
+        self.retry_after = retry_after
+
+class PlatformQuota:
+    """Sliding-window call log for one platform, app-wide and per user"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.calls: Deque[Tuple[float, Optional[int]]] = deque()
+        self.user_calls: Dict[Optional[int], Deque[Tuple[float, str]]] = {}
+        self.waiting: Counter = Counter()
+
+    def prune(self, now: float):
+        while self.calls and self.calls[0][0] <= now - self.window:
+            _, user_id = self.calls.popleft()
+            user_calls = self.user_calls[user_id]
+            user_calls.popleft()
+            if not user_calls:
+                del self.user_calls[user_id]
+
+    def fair_share(self) -> int:
+        """Calls per window each user may make while others are waiting"""
+        return max(1, self.limit // max(1, len(self.waiting)))
+
+class OutboundQuota:
+    """Shares each music platform's app-wide rate limit fairly between users.
+
+    All users call Spotify (and Apple Music) with one app client id, so the
+    platform's limit is one budget for everyone. Every outbound call first
+    acquires a slot in a sliding window of OUTBOUND_QUOTA_WINDOW_SECONDS. While
+    the budget has room any user may take it; once users are waiting for it,
+    a user only gets a slot while under an equal share of the window, so
+    heavy syncers queue behind light users instead of starving them. Calls
+    that would wait longer than OUTBOUND_QUOTA_MAX_WAIT_SECONDS raise
+    QuotaExceeded. Budgets are per worker process.
+    """
+
+    def __init__(self, limits: Dict[str, int], window: float, max_wait: float = 10.0):
+        self.platforms = {platform: PlatformQuota(limit, window) for platform, limit in limits.items()}
+        self.max_wait = max_wait
+
+    async def acquire(self, platform: str, user_id: Optional[int], endpoint_class: str = "read"):
+        """Wait for a call slot for this user; endpoint_class (read, write, search, auth) is recorded for usage"""
+        quota = self.platforms[platform]
+        deadline = time.monotonic() + self.max_wait
+        quota.waiting[user_id] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                wait = self._take(quota, user_id, endpoint_class, now)
+                if wait == 0:
+                    return
+                if now + wait > deadline:
+                    raise QuotaExceeded(platform, wait)
+                await asyncio.sleep(wait)
+        finally:
+            quota.waiting[user_id] -= 1
+            if not quota.waiting[user_id]:
+                del quota.waiting[user_id]
+
+    def _take(self, quota: PlatformQuota, user_id: Optional[int], endpoint_class: str, now: float) -> float:
+        """Record a call and return 0, or return how long to wait before trying again"""
+        quota.prune(now)
+        if len(quota.calls) >= quota.limit:
+            return quota.calls[0][0] + quota.window - now
+
+        user_calls = quota.user_calls.get(user_id, ())
+        if len(quota.waiting) > 1 and len(user_calls) >= quota.fair_share():
+            # Over this user's share while others wait: let them go first
+            return max(0.01, min(user_calls[0][0] + quota.window - now, quota.window / quota.limit))
+
+        quota.calls.append((now, user_id))
+        quota.user_calls.setdefault(user_id, deque()).append((now, endpoint_class))
+        return 0
+
+    def usage(self, user_id: Optional[int]) -> Dict[str, dict]:
+        """Per platform: this user's calls in the current window by endpoint class, and the shared budget"""
+        now = time.monotonic()
+        usage = {}
+        for platform, quota in self.platforms.items():
+            quota.prune(now)
+            by_class = Counter(endpoint_class for _, endpoint_class in quota.user_calls.get(user_id, ()))
+            usage[platform] = {
+                "window_seconds": quota.window,
+                "calls": sum(by_class.values()),
+                "calls_by_class": dict(by_class),
+                "app_calls": len(quota.calls),
+                "app_limit": quota.limit,
+                "fair_share": quota.fair_share(),
+                "active_users": len(quota.user_calls),
+            }
+        return usage
+
+outbound_quota = OutboundQuota(
+    {"spotify": settings.SPOTIFY_CALLS_PER_WINDOW, "apple_music": settings.APPLE_MUSIC_CALLS_PER_WINDOW},
+    settings.OUTBOUND_QUOTA_WINDOW_SECONDS,
+    settings.OUTBOUND_QUOTA_MAX_WAIT_SECONDS
+)
@@ -1,15 +1,16 @@
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.models.user import User, MusicAccount
 from app.models.music import Playlist, PlaylistTrack, Track
 from app.services.spotify import SpotifyService
 from app.services.apple_music import AppleMusicService
+from app.services.outbound_quota import QuotaExceeded
 
 class PlaylistSyncService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, user_id: Optional[int] = None):
         self.db = db
-        self.spotify_service = SpotifyService()
-        self.apple_music_service = AppleMusicService()
+        self.spotify_service = SpotifyService(user_id)
+        self.apple_music_service = AppleMusicService(user_id)
     
     async def sync_playlist(self, user_id: int, playlist_id: int, platforms: List[str]) -> Dict[str, Any]:
         """Sync playlist across specified platforms"""
@@ -50,6 +51,8 @@ class PlaylistSyncService:
                     else:
                         errors.append("Failed to sync to Apple Music")
                         
+            except QuotaExceeded:
+                raise
             except Exception as e:
                 errors.append(f"Error syncing to {account.platform}: {str(e)}")
         
@@ -108,6 +111,8 @@ class PlaylistSyncService:
             
             return True
             
+        except QuotaExceeded:
+            raise
         except Exception as e:
             print(f"Error syncing to Spotify: {e}")
             return False
@@ -130,6 +135,8 @@ class PlaylistSyncService:
             # This is a simplified version
             return True
             
+        except QuotaExceeded:
+            raise
         except Exception as e:
             print(f"Error syncing to Apple Music: {e}")
             return False
\ No newline at end of file
@@ -0,0 +1,105 @@
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.music import Track
+from app.utils.pagination import decode_cursor, encode_cursor, paginate
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+class TrackSearchService:
+    """Relevance-ranked track search backed by the database's full-text index.
+
+    PostgreSQL uses the tsvector column and pg_trgm indexes from migration 0003,
+    SQLite uses the tracks_fts FTS5 table. Any other backend falls back to LIKE.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def search(self, query: str, limit: int = 20) -> List[Track]:
+        """Search tracks by title, artist and album, best matches first"""
+        return self.search_page(query, limit)[0]
+
+    def search_page(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Track], Optional[str]]:
+        """One page of search results and the cursor for the next page.
+
+        Results are ordered by (relevance, id); the cursor carries the last
+        row's score and id so the next page resumes right after it.
+        """
+        tokens = self._tokenize(query)
+        if not tokens:
+            return [], None
+
+        if self.dialect not in ("postgresql", "sqlite"):
+            return self._search_like(query, limit, cursor)
+
+        after_score, after_id = decode_cursor(cursor, (float, int)) if cursor else (None, None)
+        if self.dialect == "postgresql":
+            rows = self._search_postgresql(query, tokens, limit + 1, after_score, after_id)
+        else:
+            rows = self._search_sqlite(tokens, limit + 1, after_score, after_id)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1].score, rows[-1].id])
+
+        tracks = self.db.query(Track).filter(Track.id.in_([row.id for row in rows])).all()
+        tracks_by_id = {track.id: track for track in tracks}
+        return [tracks_by_id[row.id] for row in rows if row.id in tracks_by_id], next_cursor
+
+    def _tokenize(self, query: str) -> List[str]:
+        return [token.lower() for token in TOKEN_PATTERN.findall(query)]
+
+    def _search_postgresql(self, query: str, tokens: List[str], limit: int, after_score, after_id):
+        # Every token must match as a prefix; trigram similarity catches typos the tsquery misses
+        ts_query = " & ".join(f"{token}:*" for token in tokens)
+        statement = text("""
+            SELECT id, score FROM (
+                SELECT tracks.id,
+                       ts_rank_cd(tracks.search_vector, query)
+                       + greatest(similarity(tracks.title, :q), similarity(tracks.artist, :q)) AS score
+                FROM tracks, to_tsquery('simple', :ts_query) AS query
+                WHERE tracks.search_vector @@ query
+                   OR tracks.title % :q
+                   OR tracks.artist % :q
+            ) AS matches
+            WHERE CAST(:after_score AS double precision) IS NULL
+               OR score < :after_score
+               OR (score = :after_score AND id > :after_id)
+            ORDER BY score DESC, id
+            LIMIT :limit
+        """)
+        return self.db.execute(statement, {
+            "ts_query": ts_query, "q": query, "limit": limit,
+            "after_score": after_score, "after_id": after_id,
+        }).all()
+
+    def _search_sqlite(self, tokens: List[str], limit: int, after_score, after_id):
+        # Quote each token so FTS5 operators in user input are treated as text.
+        # bm25() is negative and lower is better, so pages walk it upwards.
+        match = " ".join(f'"{token}"*' for token in tokens)
+        statement = text("""
+            SELECT rowid AS id, bm25(tracks_fts, 10.0, 5.0, 2.0) AS score
+            FROM tracks_fts
+            WHERE tracks_fts MATCH :match
+              AND (:after_score IS NULL
+                   OR bm25(tracks_fts, 10.0, 5.0, 2.0) > :after_score
+                   OR (bm25(tracks_fts, 10.0, 5.0, 2.0) = :after_score AND rowid > :after_id))
+            ORDER BY score, id
+            LIMIT :limit
+        """)
+        return self.db.execute(statement, {
+            "match": match, "limit": limit,
+            "after_score": after_score, "after_id": after_id,
+        }).all()
+
+    def _search_like(self, query: str, limit: int, cursor: Optional[str]) -> Tuple[List[Track], Optional[str]]:
+        return paginate(
+            self.db.query(Track).filter(
+                Track.title.contains(query) | Track.artist.contains(query) | Track.album.contains(query)
+            ),
+            [(Track.id, False)], cursor, limit, lambda track: [track.id]
+        )
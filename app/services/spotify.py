@@ -4,9 +4,12 @@ from urllib.parse import urlencode
 from typing import Dict, Any, Optional, List
 import time
 from app.core.config import settings
+from app.services.outbound_quota import QuotaExceeded, outbound_quota
 
 class SpotifyService:
-    def __init__(self):
+    def __init__(self, user_id: Optional[int] = None):
+        # The app user whose share of the outbound quota these calls count against
+        self.user_id = user_id
         self.client_id = settings.SPOTIFY_CLIENT_ID
         self.client_secret = settings.SPOTIFY_CLIENT_SECRET
         self.redirect_uri = settings.SPOTIFY_REDIRECT_URI
@@ -20,6 +23,11 @@ class SpotifyService:
         if self.demo_mode:
             print("🎧 Spotify running in DEMO MODE - configure real credentials for production")
     
+    async def _request(self, method: str, endpoint_class: str, url: str, **kwargs) -> requests.Response:
+        """Send one API request once the user's share of the app-wide quota allows it"""
+        await outbound_quota.acquire("spotify", self.user_id, endpoint_class)
+        return requests.request(method, url, **kwargs)
+    
     def get_auth_url(self, state: Optional[str] = None) -> str:
         """Generate Spotify authorization URL"""
         if self.demo_mode:
@@ -76,7 +84,7 @@ class SpotifyService:
             "redirect_uri": self.redirect_uri
         }
         
-        response = requests.post(self.token_url, headers=headers, data=data)
+        response = await self._request("POST", "auth", self.token_url, headers=headers, data=data)
         response.raise_for_status()
         
         return response.json()
@@ -95,7 +103,7 @@ class SpotifyService:
             "refresh_token": refresh_token
         }
         
-        response = requests.post(self.token_url, headers=headers, data=data)
+        response = await self._request("POST", "auth", self.token_url, headers=headers, data=data)
         response.raise_for_status()
         
         return response.json()
@@ -114,7 +122,7 @@ class SpotifyService:
         
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        response = requests.get(f"{self.base_url}/me", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/me", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -124,7 +132,7 @@ class SpotifyService:
         headers = {"Authorization": f"Bearer {access_token}"}
         params = {"limit": limit}
         
-        response = requests.get(f"{self.base_url}/me/playlists", headers=headers, params=params)
+        response = await self._request("GET", "read", f"{self.base_url}/me/playlists", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -133,7 +141,7 @@ class SpotifyService:
         """Get tracks from a playlist"""
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        response = requests.get(f"{self.base_url}/playlists/{playlist_id}/tracks", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/playlists/{playlist_id}/tracks", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -151,7 +159,7 @@ class SpotifyService:
             "public": public
         }
         
-        response = requests.post(f"{self.base_url}/users/{user_id}/playlists", headers=headers, json=data)
+        response = await self._request("POST", "write", f"{self.base_url}/users/{user_id}/playlists", headers=headers, json=data)
         response.raise_for_status()
         
         return response.json()
@@ -165,7 +173,7 @@ class SpotifyService:
         
         data = {"uris": track_uris}
         
-        response = requests.post(f"{self.base_url}/playlists/{playlist_id}/tracks", headers=headers, json=data)
+        response = await self._request("POST", "write", f"{self.base_url}/playlists/{playlist_id}/tracks", headers=headers, json=data)
         response.raise_for_status()
         
         return response.json()
@@ -179,7 +187,7 @@ class SpotifyService:
             "limit": limit
         }
         
-        response = requests.get(f"{self.base_url}/search", headers=headers, params=params)
+        response = await self._request("GET", "search", f"{self.base_url}/search", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()    
@@ -192,7 +200,7 @@ class SpotifyService:
             "limit": limit
         }
         
-        response = requests.get(f"{self.base_url}/me/top/tracks", headers=headers, params=params)
+        response = await self._request("GET", "read", f"{self.base_url}/me/top/tracks", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -205,7 +213,7 @@ class SpotifyService:
             "limit": limit
         }
         
-        response = requests.get(f"{self.base_url}/me/top/artists", headers=headers, params=params)
+        response = await self._request("GET", "read", f"{self.base_url}/me/top/artists", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -218,7 +226,7 @@ class SpotifyService:
             "offset": offset
         }
         
-        response = requests.get(f"{self.base_url}/me/tracks", headers=headers, params=params)
+        response = await self._request("GET", "read", f"{self.base_url}/me/tracks", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -233,7 +241,7 @@ class SpotifyService:
         # Spotify allows max 50 tracks per request
         for i in range(0, len(track_ids), 50):
             batch = track_ids[i:i+50]
-            response = requests.put(f"{self.base_url}/me/tracks", headers=headers, json={"ids": batch})
+            response = await self._request("PUT", "write", f"{self.base_url}/me/tracks", headers=headers, json={"ids": batch})
             response.raise_for_status()
         
         return True
@@ -247,7 +255,7 @@ class SpotifyService:
         
         for i in range(0, len(track_ids), 50):
             batch = track_ids[i:i+50]
-            response = requests.delete(f"{self.base_url}/me/tracks", headers=headers, json={"ids": batch})
+            response = await self._request("DELETE", "write", f"{self.base_url}/me/tracks", headers=headers, json={"ids": batch})
             response.raise_for_status()
         
         return True
@@ -270,7 +278,7 @@ class SpotifyService:
         # Add audio feature parameters (e.g., target_energy=0.8, min_danceability=0.5)
         params.update(audio_features)
         
-        response = requests.get(f"{self.base_url}/recommendations", headers=headers, params=params)
+        response = await self._request("GET", "read", f"{self.base_url}/recommendations", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -285,7 +293,7 @@ class SpotifyService:
             batch = track_ids[i:i+100]
             params = {"ids": ",".join(batch)}
             
-            response = requests.get(f"{self.base_url}/audio-features", headers=headers, params=params)
+            response = await self._request("GET", "read", f"{self.base_url}/audio-features", headers=headers, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -297,7 +305,7 @@ class SpotifyService:
         """Get detailed track information"""
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        response = requests.get(f"{self.base_url}/tracks/{track_id}", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/tracks/{track_id}", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -306,7 +314,7 @@ class SpotifyService:
         """Get tracks from an album"""
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        response = requests.get(f"{self.base_url}/albums/{album_id}/tracks", headers=headers)
+        response = await self._request("GET", "read", f"{self.base_url}/albums/{album_id}/tracks", headers=headers)
         response.raise_for_status()
         
         return response.json()
@@ -316,7 +324,7 @@ class SpotifyService:
         headers = {"Authorization": f"Bearer {access_token}"}
         params = {"country": country}
         
-        response = requests.get(f"{self.base_url}/artists/{artist_id}/top-tracks", headers=headers, params=params)
+        response = await self._request("GET", "read", f"{self.base_url}/artists/{artist_id}/top-tracks", headers=headers, params=params)
         response.raise_for_status()
         
         return response.json()
@@ -330,7 +338,7 @@ class SpotifyService:
         
         data = {"public": public}
         
-        response = requests.put(f"{self.base_url}/playlists/{playlist_id}/followers", headers=headers, json=data)
+        response = await self._request("PUT", "write", f"{self.base_url}/playlists/{playlist_id}/followers", headers=headers, json=data)
         response.raise_for_status()
         
         return True
@@ -339,7 +347,7 @@ class SpotifyService:
         """Unfollow a playlist"""
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        response = requests.delete(f"{self.base_url}/playlists/{playlist_id}/followers", headers=headers)
+        response = await self._request("DELETE", "write", f"{self.base_url}/playlists/{playlist_id}/followers", headers=headers)
         response.raise_for_status()
         
         return True
@@ -365,19 +373,21 @@ class SpotifyService:
                 headers = {"Authorization": f"Bearer {access_token}"}
                 
                 if method == 'GET':
-                    response = requests.get(url, headers=headers)
+                    response = await self._request("GET", "read", url, headers=headers)
                 elif method == 'POST':
-                    response = requests.post(url, headers=headers, json=request_data.get('data'))
+                    response = await self._request("POST", "write", url, headers=headers, json=request_data.get('data'))
                 elif method == 'PUT':
-                    response = requests.put(url, headers=headers, json=request_data.get('data'))
+                    response = await self._request("PUT", "write", url, headers=headers, json=request_data.get('data'))
                 elif method == 'DELETE':
-                    response = requests.delete(url, headers=headers)
+                    response = await self._request("DELETE", "write", url, headers=headers)
                 
                 self.handle_rate_limit(response)
                 response.raise_for_status()
                 
                 results.append(response.json())
                 
+            except QuotaExceeded:
+                raise
             except Exception as e:
                 results.append({"error": str(e)})
         
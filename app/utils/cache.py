@@ -1,83 +1,549 @@
-import json
-import redis
-from typing import Any, Optional
+import asyncio
+import functools
+import inspect
+import math
+import random
+import time
+import uuid
+import redis.asyncio as aioredis
+from fastapi import Response
+from pydantic import TypeAdapter
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
 from app.core.config import settings
+from app.utils.codecs import PayloadCodec
+
+# Returned by CacheService._execute when Redis could not be reached
+_FAILED = object()
+
+# Deletes a lock only if it still holds our token, so an expired lock taken over
+# by another worker is never released by us
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Deletes every key in the given tag sets and the sets themselves, then tells the
+# other workers which keys and tags to drop from L1 - all in one round trip.
+# Publishing the keys matters: L1 copies filled from L2 do not know their tags.
+# KEYS: tag sets; ARGV[1]: tag channel, ARGV[2]: sender id, ARGV[3]: key channel,
+# ARGV[4..]: tag names
+_INVALIDATE_TAGS_SCRIPT = """
+local deleted = 0
+for i, tag_key in ipairs(KEYS) do
+    local members = redis.call("smembers", tag_key)
+    for first = 1, #members, 500 do
+        local last = math.min(first + 499, #members)
+        deleted = deleted + redis.call("del", unpack(members, first, last))
+        redis.call("publish", ARGV[3], ARGV[2] .. ":" .. table.concat(members, "\\n", first, last))
+    end
+    redis.call("del", tag_key)
+    redis.call("publish", ARGV[1], ARGV[2] .. ":" .. ARGV[i + 3])
+end
+return deleted
+"""
+
+class LocalCache:
+    """Size-bounded in-process LRU of already-decoded values.
+
+    Every entry also expires after at most ttl_seconds and may carry tags, so
+    that everything tagged e.g. "playlist:7" can be dropped at once. Values are
+    handed out as stored, not copied, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tagged: Dict[str, Set[str]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        ttl = min(expire, self.ttl_seconds) if expire else self.ttl_seconds
+        tags = tuple(tags)
+        self.delete(key)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.delete(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def delete_tag(self, tag: str):
+        for key in list(self._tagged.get(tag, ())):
+            self.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._tagged.clear()
+
+    def __len__(self):
+        return len(self._entries)
 
 class CacheService:
+    """Two-tier cache: an in-process LocalCache (L1) in front of Redis (L2).
+
+    Redis is reached through one asyncio connection pool created by connect()
+    in the app lifespan. Every command has a timeout; after a failure Redis is
+    skipped for an exponentially growing backoff and then retried lazily by the
+    next operation, so an outage degrades to L1-only caching instead of
+    stalling requests.
+
+    Writes and deletes publish the key on a Redis channel so every other
+    worker drops its L1 copy; the L1 TTL bounds staleness if a message is missed.
+    Entries can be tagged and invalidated by tag (see invalidate_tags).
+    """
+
     def __init__(self):
-        try:
-            self.redis_client = redis.from_url(settings.REDIS_URL)
-            self.redis_client.ping()  # Test connection
-            self.enabled = True
-        except:
-            print("Redis not available, caching disabled")
+        self.local = LocalCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_TTL_SECONDS)
+        self.codec = PayloadCodec(settings.CACHE_CODEC, settings.CACHE_COMPRESSION, settings.CACHE_COMPRESSION_MIN_BYTES)
+        self.instance_id = uuid.uuid4().hex
+        self.redis_client: Optional[aioredis.Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._subscribers: Dict[str, Callable[[Optional[str]], None]] = {}
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether Redis is connected and not backing off after a failure"""
+        return self.redis_client is not None and time.monotonic() >= self._retry_at
+    
+    async def connect(self):
+        """Create the shared connection pool and start the invalidation listener"""
+        if self.redis_client is not None:
+            return
+        
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.CACHE_MAX_CONNECTIONS,
+            timeout=settings.CACHE_OP_TIMEOUT_SECONDS,
+            socket_timeout=settings.CACHE_OP_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_OP_TIMEOUT_SECONDS
+        )
+        self.redis_client = aioredis.Redis(connection_pool=pool)
+        if await self._execute(lambda client: client.ping()) is _FAILED:
+            print("Redis not available, using in-process cache only until it comes back")
+        self._listener = asyncio.create_task(self._listen_for_invalidations())
+    
+    async def close(self):
+        """Stop the listener and release every pooled connection"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            await self.redis_client.connection_pool.disconnect()
             self.redis_client = None
-            self.enabled = False
     
-    async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
+    async def _execute(self, command: Callable[[aioredis.Redis], Awaitable]) -> Any:
+        """Run one Redis command with a timeout; returns _FAILED if Redis is down"""
         if not self.enabled:
-            return None
+            return _FAILED
         
         try:
-            value = self.redis_client.get(key)
-            if value:
-                return json.loads(value)
+            result = await asyncio.wait_for(command(self.redis_client), settings.CACHE_OP_TIMEOUT_SECONDS)
+        except Exception as e:
+            self._backoff = min(
+                max(self._backoff * 2, settings.CACHE_RECONNECT_BACKOFF_SECONDS),
+                settings.CACHE_RECONNECT_BACKOFF_MAX_SECONDS
+            )
+            self._retry_at = time.monotonic() + self._backoff
+            print(f"Redis error: {e!r}, retrying in {self._backoff:.1f}s")
+            return _FAILED
+        
+        self._backoff = 0.0
+        return result
+    
+    async def run(self, command: Callable[[aioredis.Redis], Awaitable]) -> Any:
+        """Run raw Redis commands (e.g. a pipeline) with the usual timeout and backoff; None if Redis is down"""
+        result = await self._execute(command)
+        return None if result is _FAILED else result
+    
+    def subscribe(self, channel: str, callback: Callable[[Optional[str]], None]):
+        """Deliver messages on another Redis channel to callback(data) through the invalidation listener.
+
+        Register before connect(). callback(None) means messages may have been
+        missed while the listener was disconnected.
+        """
+        self._subscribers[channel] = callback
+    
+    async def _listen_for_invalidations(self):
+        backoff = settings.CACHE_RECONNECT_BACKOFF_SECONDS
+        disconnected = False
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL, self._tag_channel, *self._subscribers)
+                backoff = settings.CACHE_RECONNECT_BACKOFF_SECONDS
+                if disconnected:
+                    # Invalidations published while disconnected were missed;
+                    # drop L1 once, now that new ones will arrive again
+                    disconnected = False
+                    self.local.clear()
+                    for callback in self._subscribers.values():
+                        callback(None)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message:
+                        self._on_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e!r}")
+                disconnected = True
+            finally:
+                await pubsub.reset()
+            
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, settings.CACHE_RECONNECT_BACKOFF_MAX_SECONDS)
+    
+    @property
+    def _tag_channel(self) -> str:
+        return f"{settings.CACHE_INVALIDATION_CHANNEL}:tags"
+    
+    def _on_message(self, message):
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        callback = self._subscribers.get(channel)
+        if callback is None:
+            self._on_invalidation(message)
+            return
+        data = message["data"]
+        callback(data.decode() if isinstance(data, bytes) else data)
+    
+    def _on_invalidation(self, message):
+        channel, data = message["channel"], message["data"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(data, bytes):
+            data = data.decode()
+        sender, _, name = data.partition(":")
+        # Our own writes already updated L1
+        if sender == self.instance_id:
+            return
+        if channel == self._tag_channel:
+            self.local.delete_tag(name)
+        else:
+            for key in name.split("\n"):
+                self.local.delete(key)
+    
+    def _invalidation_message(self, *keys: str) -> str:
+        return f"{self.instance_id}:" + "\n".join(keys)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from cache, local memory first"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        
+        value = await self._execute(lambda client: client.get(key))
+        if value is _FAILED or not value:
             return None
+        
+        try:
+            value = self.codec.decode(value)
         except Exception as e:
             print(f"Cache get error: {e}")
             return None
+        self.local.set(key, value)
+        return value
     
-    async def set(self, key: str, value: Any, expire: int = 3600):
-        """Set value in cache with expiration"""
-        if not self.enabled:
-            return False
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several values, local memory first and the rest with one MGET; misses are left out"""
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
         
-        try:
-            serialized_value = json.dumps(value, default=str)
-            self.redis_client.setex(key, expire, serialized_value)
+        if not missing:
+            return found
+        values = await self._execute(lambda client: client.mget(missing))
+        if values is _FAILED:
+            return found
+        
+        for key, value in zip(missing, values):
+            if not value:
+                continue
+            try:
+                value = self.codec.decode(value)
+            except Exception as e:
+                print(f"Cache get error: {e}")
+                continue
+            self.local.set(key, value)
+            found[key] = value
+        return found
+    
+    async def set(self, key: str, value: Any, expire: int = 3600, tags: Iterable[str] = ()):
+        """Set value in cache with expiration, optionally tagged for invalidate_tags"""
+        return await self.set_many({key: value}, expire, {key: tags})
+    
+    async def set_many(self, values: Dict[str, Any], expire: int = 3600,
+                       tags: Optional[Dict[str, Iterable[str]]] = None):
+        """Set several values in one pipelined round trip; tags maps keys to their tags"""
+        if not values:
             return True
+        
+        tags = {key: tuple(key_tags) for key, key_tags in (tags or {}).items()}
+        if any(tags.values()):
+            # A tag set must outlive every entry it lists
+            expire = min(expire, settings.CACHE_TAG_TTL_SECONDS)
+        try:
+            payloads = {key: self.codec.encode(value) for key, value in values.items()}
         except Exception as e:
             print(f"Cache set error: {e}")
             return False
+        
+        def write(client: aioredis.Redis):
+            pipe = client.pipeline(transaction=False)
+            for key, payload in payloads.items():
+                pipe.setex(key, expire, payload)
+                for tag in tags.get(key, ()):
+                    pipe.sadd(self._tag_key(tag), key).expire(self._tag_key(tag), settings.CACHE_TAG_TTL_SECONDS)
+            return pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, self._invalidation_message(*payloads)).execute()
+        
+        if self.enabled and await self._execute(write) is _FAILED:
+            for key in payloads:
+                self.local.delete(key)
+            return False
+        
+        # Keep the decoded form so L1 hits look exactly like L2 hits
+        for key, payload in payloads.items():
+            self.local.set(key, self.codec.decode(payload), expire, tags.get(key, ()))
+        return True
     
     async def delete(self, key: str):
         """Delete key from cache"""
-        if not self.enabled:
-            return False
+        return await self.delete_many([key])
+    
+    async def delete_many(self, keys: Iterable[str]):
+        """Delete several keys in one pipelined round trip"""
+        keys = list(dict.fromkeys(keys))
+        for key in keys:
+            self.local.delete(key)
+        if not keys or not self.enabled:
+            return True
         
-        try:
-            self.redis_client.delete(key)
+        deleted = await self._execute(
+            lambda client: client.pipeline(transaction=False)
+            .delete(*keys)
+            .publish(settings.CACHE_INVALIDATION_CHANNEL, self._invalidation_message(*keys))
+            .execute()
+        )
+        return deleted is not _FAILED
+    
+    async def invalidate_tags(self, *tags: str):
+        """Drop every entry carrying any of the tags, on all workers, in one round trip"""
+        for tag in tags:
+            self.local.delete_tag(tag)
+        if not tags or not self.enabled:
             return True
-        except Exception as e:
-            print(f"Cache delete error: {e}")
+        
+        invalidated = await self._execute(lambda client: client.eval(
+            _INVALIDATE_TAGS_SCRIPT, len(tags), *(self._tag_key(tag) for tag in tags),
+            self._tag_channel, self.instance_id, settings.CACHE_INVALIDATION_CHANNEL, *tags
+        ))
+        return invalidated is not _FAILED
+    
+    def invalidate_tags_soon(self, *tags: str):
+        """invalidate_tags for synchronous callers: L1 now, Redis on the running event loop"""
+        for tag in tags:
+            self.local.delete_tag(tag)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate_tags(*tags))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    def _tag_key(self, tag: str) -> str:
+        return f"cachetag:{tag}"
+    
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]], expire: int = 3600,
+                             stale_ttl: int = 0, beta: float = 1.0, tags: Iterable[str] = ()) -> Any:
+        """Get a cached value, computing it at most once across workers on a miss.
+
+        Shortly before expiry a request may refresh the value in the background
+        (more likely the closer expiry is and the slower compute was, scaled by
+        beta). For stale_ttl seconds after expiry the old value is still served
+        while one background refresh runs. A None result (a miss) is returned
+        but not cached. compute must not depend on request-scoped state such as
+        the request's DB session.
+        """
+        entry = await self.get(key)
+        if self._is_entry(entry):
+            now = time.time()
+            # XFetch: -log(u) is exponentially distributed, so early refreshes are rare until expiry is close
+            if now - entry["t"] * beta * math.log(1.0 - random.random()) < entry["e"]:
+                return entry["v"]
+            if now < entry["e"] + stale_ttl:
+                self._refresh_in_background(key, compute, expire, stale_ttl, tags)
+                return entry["v"]
+        
+        self.local.delete(key)
+        value = await asyncio.shield(self._single_flight(key, compute, expire, stale_ttl, tags, wait=True))
+        if value is _FAILED:
+            # Joined a background refresh that yielded to another worker
+            value = await compute()
+        return value
+    
+    async def refresh(self, key: str, compute: Callable[[], Awaitable[Any]], expire: int = 3600,
+                      stale_ttl: int = 0, tags: Iterable[str] = (), min_ttl: float = 0) -> bool:
+        """Recompute a get_or_compute entry ahead of demand.
+
+        Skipped when the entry stays fresh for at least min_ttl more seconds or
+        another worker is already recomputing it. Returns whether it was written.
+        """
+        entry = await self.get(key)
+        if self._is_entry(entry) and entry["e"] - time.time() > min_ttl:
             return False
+        result = await asyncio.shield(self._single_flight(key, compute, expire, stale_ttl, tags, wait=False))
+        return result is not _FAILED and result is not None
     
-    async def get_trending_tracks(self):
-        """Get cached trending tracks"""
-        return await self.get("trending_tracks")
+    def _is_entry(self, entry) -> bool:
+        return isinstance(entry, dict) and entry.keys() == {"v", "t", "e"}
     
-    async def set_trending_tracks(self, tracks: list, expire: int = 1800):
-        """Cache trending tracks for 30 minutes"""
-        return await self.set("trending_tracks", tracks, expire)
+    def _single_flight(self, key: str, compute, expire: int, stale_ttl: int, tags: Iterable[str], wait: bool) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._recompute(key, compute, expire, stale_ttl, tags, wait))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
     
-    async def get_user_playlists(self, user_id: int):
-        """Get cached user playlists"""
-        return await self.get(f"user_playlists:{user_id}")
+    def _refresh_in_background(self, key: str, compute, expire: int, stale_ttl: int, tags: Iterable[str]):
+        if key not in self._inflight:
+            self._single_flight(key, compute, expire, stale_ttl, tags, wait=False).add_done_callback(self._report_refresh_error)
     
-    async def set_user_playlists(self, user_id: int, playlists: list, expire: int = 600):
-        """Cache user playlists for 10 minutes"""
-        return await self.set(f"user_playlists:{user_id}", playlists, expire)
+    def _report_refresh_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            print(f"Cache refresh error: {task.exception()!r}")
+    
+    async def _recompute(self, key: str, compute, expire: int, stale_ttl: int, tags: Iterable[str], wait: bool) -> Any:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        acquired = await self._execute(lambda client: client.set(
+            lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT_SECONDS * 1000)
+        ))
+        
+        if acquired is None:
+            # Another worker is computing this key
+            if not wait:
+                return _FAILED
+            deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.CACHE_LOCK_POLL_SECONDS)
+                entry = await self.get(key)
+                if self._is_entry(entry) and time.time() < entry["e"]:
+                    return entry["v"]
+                if not await self._execute(lambda client: client.exists(lock_key)):
+                    break  # Released without writing: the value was a miss
+            # The lock holder missed, is too slow or died; compute here rather than fail the request
+        
+        try:
+            started = time.monotonic()
+            value = await compute()
+            if value is not None:
+                entry = {"v": value, "t": time.monotonic() - started, "e": time.time() + expire}
+                await self.set(key, entry, expire + stale_ttl, tags)
+            return value
+        finally:
+            if acquired is True:
+                await self._execute(lambda client: client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token))
     
     async def invalidate_user_cache(self, user_id: int):
         """Invalidate all cache for a user"""
-        keys_to_delete = [
-            f"user_playlists:{user_id}",
-            f"user_favorites:{user_id}",
-            f"user_profile:{user_id}"
-        ]
+        return await self.invalidate_tags(
+            f"user:{user_id}",
+            f"user:{user_id}:playlists",
+            f"user:{user_id}:favorites"
+        )
+
+cache_service = CacheService()
+
+def cached(response_model, tags: Iterable[str] = (), expire: Optional[int] = None):
+    """Cache an endpoint's serialized response in cache_service.
+
+    The key is built from the endpoint's own parameters: plain values and sets
+    are included as-is, ORM rows (such as the current user) by id, and other
+    injected objects (sessions, loaders, the response) are ignored. Tags are format strings over the
+    same parameters, e.g. "playlist:{playlist_id}" or "user:{current_user.id}".
+    Headers set on an injected Response (such as the next-page cursor) are
+    cached with the body. Apply it below the router decorator.
+    """
+    adapter = TypeAdapter(response_model)
+    expire = expire or settings.CACHE_ENDPOINT_TTL_SECONDS
+    
+    def decorator(endpoint):
+        parameters = inspect.signature(endpoint).parameters
+        response_param = next((name for name, param in parameters.items() if param.annotation is Response), None)
+        prefix = f"endpoint:{endpoint.__module__}.{endpoint.__name__}"
         
-        for key in keys_to_delete:
-            await self.delete(key)
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            parts = ((name, _key_part(value)) for name, value in sorted(kwargs.items()))
+            key = prefix + ":" + "&".join(f"{name}={part}" for name, part in parts if part is not None)
+            response = kwargs.get(response_param)
+            
+            hit = await cache_service.get(key)
+            if hit is not None:
+                if response is not None:
+                    for header, value in hit["headers"].items():
+                        response.headers[header] = value
+                return hit["body"]
+            
+            result = await endpoint(**kwargs)
+            entry = {
+                "body": adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json"),
+                "headers": dict(response.headers) if response is not None else {}
+            }
+            await cache_service.set(key, entry, expire, [tag.format(**kwargs) for tag in tags])
+            return entry["body"]
+        
+        return wrapper
+    
+    return decorator
 
-cache_service = CacheService()
\ No newline at end of file
+def _key_part(value) -> Optional[str]:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return str(value)
+    if isinstance(value, (set, frozenset, list, tuple)):
+        return ",".join(sorted(map(str, value)))
+    if hasattr(value, "__table__") or isinstance(getattr(value, "id", None), int):
+        # ORM rows and the current user's principal are identified by id
+        return str(value.id)
+    return None
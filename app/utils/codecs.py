@@ -0,0 +1,116 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Every payload starts with one header byte: 1xxx yyyy, codec id x and compression id y.
+# A plain JSON document never starts with a byte >= 0x80, so values written
+# before the header existed still decode.
+HEADER_FLAG = 0x80
+
+# msgpack extension type used to keep datetimes as datetimes
+_MSGPACK_DATETIME = 1
+
+class Codec:
+    def __init__(self, codec_id: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        self.id = codec_id
+        self.dumps = dumps
+        self.loads = loads
+
+class Compressor:
+    def __init__(self, compressor_id: int, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+        self.id = compressor_id
+        self.compress = compress
+        self.decompress = decompress
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_MSGPACK_DATETIME, value.isoformat().encode())
+    return str(value)
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == _MSGPACK_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+CODECS: Dict[str, Codec] = {"json": Codec(1, _json_dumps, json.loads)}
+if orjson is not None:
+    CODECS["orjson"] = Codec(
+        2,
+        lambda value: orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS),
+        orjson.loads
+    )
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        3,
+        lambda value: msgpack.packb(value, default=_msgpack_default, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    )
+
+COMPRESSORS: Dict[str, Compressor] = {
+    "none": Compressor(0, lambda data: data, lambda data: data),
+    "zlib": Compressor(1, lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+if lz4_frame is not None:
+    COMPRESSORS["lz4"] = Compressor(2, lz4_frame.compress, lz4_frame.decompress)
+
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+class PayloadCodec:
+    """Encodes cache values as a header byte plus codec output, compressed when large.
+
+    The header records how each value was written, so the configured codec or
+    compression can change at any time: old entries keep decoding until they
+    expire. Unknown or unavailable choices fall back to json / no compression.
+    """
+
+    def __init__(self, codec: str = "orjson", compression: str = "zlib", compress_min_bytes: int = 1024):
+        if codec not in CODECS:
+            print(f"Cache codec {codec} not available, using json")
+            codec = "json"
+        if compression not in COMPRESSORS:
+            print(f"Cache compression {compression} not available, storing uncompressed")
+            compression = "none"
+
+        self.codec = CODECS[codec]
+        self.compressor = COMPRESSORS[compression]
+        self.compress_min_bytes = compress_min_bytes
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.dumps(value)
+        compressor = COMPRESSORS["none"]
+        if self.compressor.id and len(data) >= self.compress_min_bytes:
+            compressed = self.compressor.compress(data)
+            if len(compressed) < len(data):
+                data, compressor = compressed, self.compressor
+        return bytes([HEADER_FLAG | self.codec.id << 4 | compressor.id]) + data
+
+    def decode(self, payload: bytes) -> Any:
+        header = payload[0]
+        if not header & HEADER_FLAG:
+            return json.loads(payload)
+
+        codec = _CODECS_BY_ID.get(header >> 4 & 0x7)
+        compressor = _COMPRESSORS_BY_ID.get(header & 0xF)
+        if codec is None or compressor is None:
+            raise ValueError(f"Cache payload written with an unavailable codec (header {header:#x})")
+        return codec.loads(compressor.decompress(payload[1:]))
@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.user import User
+from app.models.music import Playlist, Track
+from app.utils.cache import cache_service
+
+# Keep IN (...) lists under SQLite's bound-parameter limit
+MAX_BATCH_SIZE = 500
+
+# Models whose rows loaders share through cache_service, with the tag prefix of
+# each row and the columns that must never leave the database
+CACHED_MODELS = {
+    User: ("user", {"hashed_password"}),
+    Track: ("track", set()),
+}
+
+class DataLoader:
+    """Coalesces primary-key lookups for one model into batched IN (...) queries.
+
+    load() calls made in the same event-loop tick are resolved by a single
+    query; load_many() batches explicitly. Rows are memoized for the rest of
+    the request, so asking for the same id twice never hits the database again.
+
+    For models in CACHED_MODELS, ids are first looked up in cache_service with
+    one get_many and only the misses are queried. Cache hits come back as
+    detached, read-only instances without the excluded columns.
+    """
+
+    def __init__(self, db: Session, model):
+        self.db = db
+        self.model = model
+        self._cache: Dict[int, Optional[object]] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._shared = CACHED_MODELS.get(model)
+
+    async def load(self, key: int):
+        """Load one row by id, batched with other loads in the same tick"""
+        if key in self._cache:
+            return self._cache[key]
+
+        if key not in self._pending:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending[key] = loop.create_future()
+        return await self._pending[key]
+
+    async def load_many(self, keys: Iterable[int]) -> List[Optional[object]]:
+        """Load rows for all keys with as few queries as possible, preserving order"""
+        keys = list(keys)
+        missing = [key for key in dict.fromkeys(keys) if key not in self._cache and key not in self._pending]
+        if missing:
+            await self._fetch(missing)
+        return [await self.load(key) for key in keys]
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        asyncio.ensure_future(self._resolve(pending))
+
+    async def _resolve(self, pending: Dict[int, asyncio.Future]):
+        try:
+            await self._fetch(pending.keys())
+        except Exception as e:
+            for future in pending.values():
+                future.set_exception(e)
+            return
+
+        for key, future in pending.items():
+            future.set_result(self._cache.get(key))
+
+    async def _fetch(self, keys: Iterable[int]):
+        keys = list(keys)
+        if self._shared:
+            cached = await cache_service.get_many(self._cache_key(key) for key in keys)
+            for key in keys:
+                data = cached.get(self._cache_key(key))
+                if data is not None:
+                    self._cache[key] = self._from_cache(data)
+            keys = [key for key in keys if key not in self._cache]
+
+        fetched = {}
+        for start in range(0, len(keys), MAX_BATCH_SIZE):
+            batch = keys[start:start + MAX_BATCH_SIZE]
+            rows = self.db.query(self.model).filter(self.model.id.in_(batch)).all()
+            for key in batch:
+                self._cache.setdefault(key, None)
+            for row in rows:
+                self._cache[row.id] = row
+                fetched[row.id] = row
+
+        if self._shared and fetched:
+            tag_prefix = self._shared[0]
+            await cache_service.set_many(
+                {self._cache_key(key): self._to_cache(row) for key, row in fetched.items()},
+                settings.CACHE_ROW_TTL_SECONDS,
+                {self._cache_key(key): [f"{tag_prefix}:{key}"] for key in fetched}
+            )
+
+    def _cache_key(self, key: int) -> str:
+        return f"row:{self.model.__tablename__}:{key}"
+
+    def _to_cache(self, row) -> dict:
+        excluded = self._shared[1]
+        return {
+            column.key: getattr(row, column.key)
+            for column in self.model.__table__.columns
+            if column.key not in excluded
+        }
+
+    def _from_cache(self, data: dict):
+        # The cache codec (msgpack) hands datetimes back as datetimes
+        return self.model(**data)
+
+class Loaders:
+    """Request-scoped loaders for the models endpoints look up by id"""
+
+    def __init__(self, db: Session):
+        self.users = DataLoader(db, User)
+        self.tracks = DataLoader(db, Track)
+        self.playlists = DataLoader(db, Playlist)
+
+def get_loaders(db: Session = Depends(get_db)) -> Loaders:
+    # FastAPI caches dependencies per request, so every dependant shares one instance
+    return Loaders(db)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_rows(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        shared = CACHED_MODELS.get(type(obj))
+        if shared and obj.id is not None:
+            session.info.setdefault("changed_cached_rows", set()).add(f"{shared[0]}:{obj.id}")
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_rows(session):
+    tags = session.info.pop("changed_cached_rows", None)
+    if tags:
+        cache_service.invalidate_tags_soon(*tags)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_rows(session):
+    session.info.pop("changed_cached_rows", None)
@@ -0,0 +1,90 @@
+import base64
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Pack the sort key of the last row into an opaque, URL-safe cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+_INVALID = object()
+
+def _cursor_value(value: Any, expected: type) -> Any:
+    # bool is an int subclass in Python but never a valid sort key here
+    if isinstance(value, bool):
+        return _INVALID
+    if expected is float and isinstance(value, (int, float)):
+        return float(value)
+    return value if isinstance(value, expected) else _INVALID
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Unpack a cursor produced by encode_cursor, rejecting anything malformed.
+
+    `types` are the Python types of the sort columns (int, float or str); a
+    value of any other type would reach the database and fail there.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        values = None
+
+    if not isinstance(values, list) or len(values) != len(types):
+        values = None
+    else:
+        values = [_cursor_value(value, expected) for value, expected in zip(values, types)]
+
+    if values is None or _INVALID in values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return values
+
+def keyset_condition(order_by: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+    """Rows strictly after `values` in the given (column, descending) ordering.
+
+    Expands to (a > x) OR (a = x AND b > y) OR ..., which works for mixed
+    directions and lets the database seek on a matching composite index.
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(order_by):
+        equal_prefix = [order_by[j][0] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+def paginate(
+    query: Query,
+    order_by: Sequence[Tuple[Any, bool]],
+    cursor: Optional[str],
+    limit: int,
+    cursor_values: Callable[[Any], Sequence[Any]],
+) -> Tuple[list, Optional[str]]:
+    """Fetch one page of `query` with keyset (seek) pagination.
+
+    `order_by` must end with a unique column so the ordering is total.
+    `cursor_values` extracts the same columns' values from a result row.
+    Returns the page and the cursor for the next one (None on the last page).
+    """
+    if cursor:
+        types = [column.type.python_type for column, _ in order_by]
+        query = query.filter(keyset_condition(order_by, decode_cursor(cursor, types)))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order_by])
+    rows = query.limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(cursor_values(rows[-1]))
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Expose the next page cursor without changing the list response body"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -1,12 +1,14 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 import asyncio
+from app.schemas.user import NowPlaying
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[int, WebSocket] = {}
         self.user_connections: Dict[int, List[WebSocket]] = {}
+        self.now_playing: Dict[int, dict] = {}
     
     async def connect(self, websocket: WebSocket, user_id: int):
         """Connect a user's WebSocket"""
@@ -36,6 +38,21 @@ class ConnectionManager:
             # Clean up empty user connections
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
+                self.now_playing.pop(user_id, None)
+    
+    def is_online(self, user_id: int) -> bool:
+        """Whether the user has an open WebSocket on this worker"""
+        return user_id in self.user_connections
+    
+    def set_now_playing(self, user_id: int, track: Optional[NowPlaying]):
+        """Remember what a connected user reported they are listening to"""
+        if track:
+            self.now_playing[user_id] = track.model_dump(exclude_none=True)
+        else:
+            self.now_playing.pop(user_id, None)
+    
+    def get_now_playing(self, user_id: int):
+        return self.now_playing.get(user_id)
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to specific WebSocket"""
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Password hashing benchmark for ChordCircle
+Reports hashes per second per core for bcrypt and argon2id cost settings,
+so PASSWORD_HASH_* settings and PASSWORD_HASH_WORKERS can be sized deliberately.
+
+Usage: python benchmark_password_hashing.py [--seconds 2] [--threads 4]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import argon2, bcrypt
+
+from app.core.config import settings
+
+PASSWORD = "correct horse battery staple"
+
+def print_header(title):
+    print("\n" + "="*60)
+    print(f"  🔐 {title}")
+    print("="*60)
+
+def candidate_settings():
+    """(label, handler) pairs to measure; the configured setting is always included"""
+    candidates = [
+        (f"bcrypt rounds={rounds}", bcrypt.using(rounds=rounds))
+        for rounds in sorted({10, 11, 12, 13, settings.BCRYPT_ROUNDS})
+    ]
+
+    if not argon2.has_backend():
+        print("argon2-cffi is not installed, skipping argon2id")
+        return candidates
+
+    argon2_settings = {
+        (2, 19456, 1),  # OWASP minimum
+        (3, 65536, 1),
+        (4, 131072, 1),
+        (settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM),
+    }
+    for time_cost, memory_cost, parallelism in sorted(argon2_settings):
+        candidates.append((
+            f"argon2id t={time_cost} m={memory_cost // 1024}MiB p={parallelism}",
+            argon2.using(type="ID", time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        ))
+    return candidates
+
+def measure(handler, seconds, threads):
+    """Hashes per second with the given number of threads hashing in parallel"""
+    hashed = handler.hash(PASSWORD)
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            handler.verify(PASSWORD, hashed)
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(lambda _: worker(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each setting")
+    parser.add_argument("--threads", type=int, default=settings.PASSWORD_HASH_WORKERS,
+                        help="parallel hashing threads (defaults to PASSWORD_HASH_WORKERS)")
+    args = parser.parse_args()
+
+    print_header("Password hashing throughput")
+    print(f"CPU cores: {os.cpu_count()}, threads: {args.threads}, {args.seconds:.1f}s per setting")
+    print(f"Configured: schemes={settings.PASSWORD_HASH_SCHEMES}, workers={settings.PASSWORD_HASH_WORKERS}")
+    candidates = candidate_settings()
+
+    print(f"\n{'Setting':<36} {'ms/hash':>8} {'hash/s/core':>12} {'hash/s total':>13}")
+    for label, handler in candidates:
+        per_core = measure(handler, args.seconds, 1)
+        total = measure(handler, args.seconds, args.threads) if args.threads > 1 else per_core
+        print(f"{label:<36} {1000 / per_core:>8.1f} {per_core:>12.1f} {total:>13.1f}")
+
+    print("\nLogin capacity per worker process ≈ hash/s total with --threads set to PASSWORD_HASH_WORKERS.")
+
+if __name__ == "__main__":
+    main()
@@ -62,6 +62,7 @@ python-multipart==0.0.6
 python-jose[cryptography]==3.5.0
 passlib[bcrypt]==1.7.4
 sqlalchemy==2.0.42
+alembic==1.12.1
 requests==2.31.0
 pydantic-settings==2.10.1
 email-validator==2.2.0
@@ -83,15 +84,9 @@ echo "🎵 Starting ChordCircle Backend..."
 # Install dependencies
 pip install -r requirements_optimized.txt
 
-# Create database tables
-python -c "
-try:
-    from app.core.database import Base, engine
-    Base.metadata.create_all(bind=engine)
-    print('✅ Database tables created')
-except Exception as e:
-    print(f'⚠️  Database setup: {e}')
-"
+# Bring the database schema up to date (the app refuses to start otherwise)
+alembic upgrade head || exit 1
+echo "✅ Database migrated"
 
 # Start the server
 python start.py
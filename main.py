@@ -1,22 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
+import math
 import uvicorn
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, SessionLocal
+from app.core.migrations import check_schema_revision, upgrade_to_head
 from app.api.v1.api import api_router
-from app.core.security import verify_token
+from app.core.security import verify_token, password_hasher
+from app.core.revocation import revoked_tokens
+from app.services.autocomplete import autocomplete_index
+from app.utils.cache import cache_service
+from app.services.cache_warmer import cache_warmer
+from app.services.outbound_quota import QuotaExceeded
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.middleware.rate_limit import RateLimitMiddleware
 
-# Create tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    Base.metadata.create_all(bind=engine)
+    # Startup: schema changes are applied by Alembic, workers only verify the revision
+    if settings.AUTO_MIGRATE:
+        upgrade_to_head()
+    check_schema_revision(engine)
+    
+    db = SessionLocal()
+    try:
+        autocomplete_index.load(db)
+    finally:
+        db.close()
+    await cache_service.connect()
+    await cache_warmer.start()
+    await revoked_tokens.start()
+    
     yield
     # Shutdown
-    pass
+    await revoked_tokens.stop()
+    await cache_warmer.stop()
+    await cache_service.close()
+    autocomplete_index.save()
 
 app = FastAPI(
     title="ChordCircle API",
@@ -25,6 +49,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Rate limiting runs inside CORS, so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -32,11 +59,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
 )
 
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
+@app.exception_handler(QuotaExceeded)
+async def quota_exceeded_handler(request: Request, exc: QuotaExceeded):
+    # A music platform's shared budget is used up: tell the client when to retry
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
+
 @app.get("/")
 async def root():
     return {
@@ -51,7 +88,12 @@ async def health_check():
 
 @app.get("/api/v1/health")
 async def api_health_check():
-    return {"status": "healthy", "api_version": "v1", "timestamp": "2025-08-05T09:57:00Z"}
+    return {
+        "status": "healthy",
+        "api_version": "v1",
+        "timestamp": "2025-08-05T09:57:00Z",
+        "password_hashing": password_hasher.stats()
+    }
 
 if __name__ == "__main__":
     uvicorn.run(
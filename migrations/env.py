@@ -0,0 +1,83 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.core.config import settings
+from app.core.database import Base
+
+# Import models so their tables are registered on Base.metadata
+from app.models import user, music  # noqa: F401
+
+config = context.config
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
+# Only the alembic CLI configures logging; upgrade_to_head() runs inside the
+# app, where fileConfig would replace uvicorn's logging setup
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Search structures are managed by hand-written migrations (0003) and are not
+# part of the ORM models, so autogenerate must not try to drop them.
+UNMANAGED_OBJECTS = {
+    "search_vector",
+    "ix_tracks_search_vector",
+    "ix_tracks_title_trgm",
+    "ix_tracks_artist_trgm",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if name in UNMANAGED_OBJECTS:
+        return False
+    if type_ == "table" and name is not None and name.startswith("tracks_fts"):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit migration SQL without connecting to the database"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=config.get_main_option("sqlalchemy.url").startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations against a live database connection"""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite cannot ALTER most things in place; batch mode recreates the table
+            render_as_batch=connection.dialect.name == "sqlite",
+            # Commit each revision on its own, so a failure (or a concurrent index
+            # build) never leaves a revision half applied
+            transaction_per_migration=True,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,33 @@
+"""lookup indexes for foreign keys used by the API
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-08-12 10:00:00
+"""
+from app.core.migrations import create_index_online, drop_index_online
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_friendships_user_id_status", "friendships", ["user_id", "status"]),
+    ("ix_friendships_friend_id_status", "friendships", ["friend_id", "status"]),
+    ("ix_playlists_user_id", "playlists", ["user_id"]),
+    ("ix_playlist_tracks_playlist_id_position", "playlist_tracks", ["playlist_id", "position"]),
+    ("ix_user_favorites_user_id_track_id", "user_favorites", ["user_id", "track_id"]),
+    ("ix_music_accounts_user_id_platform", "music_accounts", ["user_id", "platform"]),
+    ("ix_trending_tracks_rank", "trending_tracks", ["rank"]),
+]
+
+
+def upgrade():
+    for index_name, table_name, columns in INDEXES:
+        create_index_online(index_name, table_name, columns)
+
+
+def downgrade():
+    for index_name, table_name, _ in reversed(INDEXES):
+        drop_index_online(index_name, table_name)
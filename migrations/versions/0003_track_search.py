@@ -0,0 +1,135 @@
+"""full-text search over tracks
+
+PostgreSQL: a weighted tsvector column maintained by a trigger, a GIN index on
+it and pg_trgm indexes on title/artist for typo-tolerant matching.
+SQLite: an external-content FTS5 table kept in sync by triggers.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-08-19 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import create_index_online, drop_index_online
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({row}artist, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce({row}album, '')), 'C')"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        _upgrade_postgresql()
+    elif dialect == "sqlite":
+        _upgrade_sqlite()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        _downgrade_postgresql()
+    elif dialect == "sqlite":
+        _downgrade_sqlite()
+
+
+def _upgrade_postgresql():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Nullable column without a default is a catalog-only change, no table rewrite
+    op.add_column("tracks", sa.Column("search_vector", sa.dialects.postgresql.TSVECTOR(), nullable=True))
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION tracks_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {PG_SEARCH_VECTOR.format(row="NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER tracks_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, artist, album ON tracks
+        FOR EACH ROW EXECUTE FUNCTION tracks_search_vector_update()
+    """)
+
+    # Backfill existing rows in short transactions so live writes are never blocked for long
+    with op.get_context().autocommit_block():
+        while True:
+            result = op.get_bind().execute(sa.text(f"""
+                UPDATE tracks SET search_vector = {PG_SEARCH_VECTOR.format(row="")}
+                WHERE id IN (
+                    SELECT id FROM tracks WHERE search_vector IS NULL LIMIT {BACKFILL_BATCH_SIZE}
+                )
+            """))
+            if result.rowcount == 0:
+                break
+
+    create_index_online("ix_tracks_search_vector", "tracks", ["search_vector"], postgresql_using="gin")
+    create_index_online(
+        "ix_tracks_title_trgm", "tracks", ["title"],
+        postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    create_index_online(
+        "ix_tracks_artist_trgm", "tracks", ["artist"],
+        postgresql_using="gin", postgresql_ops={"artist": "gin_trgm_ops"},
+    )
+
+
+def _downgrade_postgresql():
+    drop_index_online("ix_tracks_artist_trgm", "tracks")
+    drop_index_online("ix_tracks_title_trgm", "tracks")
+    drop_index_online("ix_tracks_search_vector", "tracks")
+    op.execute("DROP TRIGGER IF EXISTS tracks_search_vector_trigger ON tracks")
+    op.execute("DROP FUNCTION IF EXISTS tracks_search_vector_update()")
+    op.drop_column("tracks", "search_vector")
+
+
+def _upgrade_sqlite():
+    op.execute("""
+        CREATE VIRTUAL TABLE tracks_fts USING fts5(
+            title, artist, album,
+            content='tracks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER tracks_fts_insert AFTER INSERT ON tracks BEGIN
+            INSERT INTO tracks_fts(rowid, title, artist, album)
+            VALUES (new.id, new.title, new.artist, new.album);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tracks_fts_delete AFTER DELETE ON tracks BEGIN
+            INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album)
+            VALUES ('delete', old.id, old.title, old.artist, old.album);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tracks_fts_update AFTER UPDATE OF title, artist, album ON tracks BEGIN
+            INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album)
+            VALUES ('delete', old.id, old.title, old.artist, old.album);
+            INSERT INTO tracks_fts(rowid, title, artist, album)
+            VALUES (new.id, new.title, new.artist, new.album);
+        END
+    """)
+    op.execute("INSERT INTO tracks_fts(tracks_fts) VALUES ('rebuild')")
+
+
+def _downgrade_sqlite():
+    op.execute("DROP TRIGGER IF EXISTS tracks_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS tracks_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS tracks_fts_insert")
+    op.execute("DROP TABLE IF EXISTS tracks_fts")
@@ -0,0 +1,44 @@
+"""composite indexes ending in id for keyset pagination
+
+Each paginated listing filters on a prefix of the index and seeks on id, so
+deep pages cost the same as the first one. The narrower indexes from 0002
+become redundant and are dropped once the replacements exist.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-08-26 10:00:00
+"""
+from app.core.migrations import create_index_online, drop_index_online
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+NEW_INDEXES = [
+    ("ix_user_favorites_user_id_id", "user_favorites", ["user_id", "id"]),
+    ("ix_playlists_user_id_id", "playlists", ["user_id", "id"]),
+    ("ix_friendships_user_id_status_id", "friendships", ["user_id", "status", "id"]),
+    ("ix_friendships_friend_id_status_id", "friendships", ["friend_id", "status", "id"]),
+]
+
+REPLACED_INDEXES = [
+    ("ix_playlists_user_id", "playlists", ["user_id"]),
+    ("ix_friendships_user_id_status", "friendships", ["user_id", "status"]),
+    ("ix_friendships_friend_id_status", "friendships", ["friend_id", "status"]),
+]
+
+
+def upgrade():
+    for index_name, table_name, columns in NEW_INDEXES:
+        create_index_online(index_name, table_name, columns)
+    for index_name, table_name, _ in REPLACED_INDEXES:
+        drop_index_online(index_name, table_name)
+
+
+def downgrade():
+    for index_name, table_name, columns in REPLACED_INDEXES:
+        create_index_online(index_name, table_name, columns)
+    for index_name, table_name, _ in reversed(NEW_INDEXES):
+        drop_index_online(index_name, table_name)
@@ -0,0 +1,101 @@
+"""store each friendship as one canonical (low, high) edge
+
+Accepted friendships used to be written twice (one row per direction).
+Rows are rewritten to (user_low_id, user_high_id, requester_id), reciprocal
+duplicates are collapsed into the original request row. This runs in one
+transaction; the indexes on the new columns, including the unique index on the
+pair, are built concurrently by 0006.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-09-02 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("friendships") as batch:
+        batch.add_column(sa.Column("user_low_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("user_high_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("requester_id", sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE friendships SET
+            user_low_id = CASE WHEN user_id < friend_id THEN user_id ELSE friend_id END,
+            user_high_id = CASE WHEN user_id < friend_id THEN friend_id ELSE user_id END,
+            requester_id = user_id
+    """)
+
+    # An accepted reciprocal row wins over any other status for the same pair
+    op.execute("""
+        UPDATE friendships SET status = 'accepted'
+        WHERE status <> 'accepted' AND EXISTS (
+            SELECT 1 FROM friendships AS other
+            WHERE other.user_low_id = friendships.user_low_id
+              AND other.user_high_id = friendships.user_high_id
+              AND other.status = 'accepted'
+        )
+    """)
+
+    # Keep the oldest row of each pair: it is the original request, so requester_id is right
+    op.execute("""
+        DELETE FROM friendships WHERE id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MIN(id) AS keep_id FROM friendships GROUP BY user_low_id, user_high_id
+            ) AS kept
+        )
+    """)
+
+    op.drop_index("ix_friendships_user_id_status_id", table_name="friendships")
+    op.drop_index("ix_friendships_friend_id_status_id", table_name="friendships")
+
+    with op.batch_alter_table("friendships") as batch:
+        batch.alter_column("user_low_id", existing_type=sa.Integer(), nullable=False)
+        batch.alter_column("user_high_id", existing_type=sa.Integer(), nullable=False)
+        batch.alter_column("requester_id", existing_type=sa.Integer(), nullable=False)
+        batch.create_foreign_key("fk_friendships_user_low_id_users", "users", ["user_low_id"], ["id"])
+        batch.create_foreign_key("fk_friendships_user_high_id_users", "users", ["user_high_id"], ["id"])
+        batch.create_foreign_key("fk_friendships_requester_id_users", "users", ["requester_id"], ["id"])
+        batch.drop_column("user_id")
+        batch.drop_column("friend_id")
+
+
+def downgrade():
+    with op.batch_alter_table("friendships") as batch:
+        batch.add_column(sa.Column("user_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("friend_id", sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE friendships SET
+            user_id = requester_id,
+            friend_id = CASE WHEN requester_id = user_low_id THEN user_high_id ELSE user_low_id END
+    """)
+
+    # Restore the reciprocal row the old accept flow used to write
+    op.execute("""
+        INSERT INTO friendships (user_id, friend_id, status, created_at, user_low_id, user_high_id, requester_id)
+        SELECT friend_id, user_id, status, created_at, user_low_id, user_high_id, requester_id
+        FROM friendships WHERE status = 'accepted'
+    """)
+
+    with op.batch_alter_table("friendships") as batch:
+        batch.drop_constraint("fk_friendships_requester_id_users", type_="foreignkey")
+        batch.drop_constraint("fk_friendships_user_high_id_users", type_="foreignkey")
+        batch.drop_constraint("fk_friendships_user_low_id_users", type_="foreignkey")
+        batch.drop_column("requester_id")
+        batch.drop_column("user_high_id")
+        batch.drop_column("user_low_id")
+        batch.alter_column("user_id", existing_type=sa.Integer(), nullable=False)
+        batch.alter_column("friend_id", existing_type=sa.Integer(), nullable=False)
+        batch.create_foreign_key("fk_friendships_user_id_users", "users", ["user_id"], ["id"])
+        batch.create_foreign_key("fk_friendships_friend_id_users", "users", ["friend_id"], ["id"])
+
+    op.create_index("ix_friendships_user_id_status_id", "friendships", ["user_id", "status", "id"])
+    op.create_index("ix_friendships_friend_id_status_id", "friendships", ["friend_id", "status", "id"])
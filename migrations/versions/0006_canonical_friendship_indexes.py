@@ -0,0 +1,29 @@
+"""indexes on the canonical friendship edge
+
+Built concurrently on PostgreSQL, outside a transaction, so they live in their
+own migration: an interrupted build leaves 0005's rewrite committed and this
+revision can simply be re-run.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-09-02 10:05:00
+"""
+from app.core.migrations import create_index_online, drop_index_online
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online("ux_friendships_pair", "friendships", ["user_low_id", "user_high_id"], unique=True)
+    create_index_online("ix_friendships_user_low_id_status_id", "friendships", ["user_low_id", "status", "id"])
+    create_index_online("ix_friendships_user_high_id_status_id", "friendships", ["user_high_id", "status", "id"])
+
+
+def downgrade():
+    drop_index_online("ix_friendships_user_high_id_status_id", "friendships")
+    drop_index_online("ix_friendships_user_low_id_status_id", "friendships")
+    drop_index_online("ux_friendships_pair", "friendships")
@@ -152,10 +152,10 @@ def create_tables():
     try:
         # Import your models to create tables
         sys.path.append(str(Path(__file__).parent))
-        from app.core.database import Base, engine
+        from app.core.migrations import upgrade_to_head
         
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Apply all migrations
+        upgrade_to_head()
         print("✅ Database tables created successfully")
         return True
         
@@ -186,10 +186,10 @@ def create_database_tables():
     try:
         # Import your models to create tables
         sys.path.append(str(Path(__file__).parent))
-        from app.core.database import Base, engine
+        from app.core.migrations import upgrade_to_head
         
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Apply all migrations
+        upgrade_to_head()
         print("✅ Database tables created successfully")
         
         # Test connection
@@ -266,7 +266,12 @@ export const subscribeToPlaylistChanges = (userId, callback) => {
 }
 
 // Real-time friend requests
+// Friendships are stored once per pair (user_low_id < user_high_id), so listen on
+// both columns and skip the requests this user sent
 export const subscribeToFriendRequests = (userId, callback) => {
+  const onInsert = (payload) => {
+    if (payload.new.requester_id !== userId) callback(payload)
+  }
   return supabase
     .channel('friendships')
     .on(
@@ -275,9 +280,19 @@ export const subscribeToFriendRequests = (userId, callback) => {
         event: 'INSERT',
         schema: 'public', 
         table: 'friendships',
-        filter: `friend_id=eq.${userId}`
+        filter: `user_low_id=eq.${userId}`
       },
-      callback
+      onInsert
+    )
+    .on(
+      'postgres_changes',
+      {
+        event: 'INSERT',
+        schema: 'public', 
+        table: 'friendships',
+        filter: `user_high_id=eq.${userId}`
+      },
+      onInsert
     )
     .subscribe()
 }
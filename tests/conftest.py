@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Tests run against a throwaway database migrated to head, never ./chordcircle.db.
+# This has to happen before the app (and its settings) are imported.
+_database_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+
+from app.core.database import Base  # noqa: E402
+from app.core.migrations import upgrade_to_head  # noqa: E402
+from app.models import music, user  # noqa: E402,F401  (registers every table on Base.metadata)
+from app.utils.cache import CacheService  # noqa: E402
+
+upgrade_to_head()
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory database with every model table"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def statements(db):
+    """SQL statements db executes from here on; clear() it after seeding"""
+    executed = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: executed.append(args[2]))
+    return executed
+
+@pytest.fixture
+def shared_redis_services():
+    """Build CacheService instances on one fake Redis server, as separate workers would be"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+
+    def make(count):
+        services = [CacheService() for _ in range(count)]
+        for service in services:
+            service.redis_client = fakeredis.aioredis.FakeRedis(server=server)
+        return services
+
+    return make
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_database_dir, ignore_errors=True)
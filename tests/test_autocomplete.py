@@ -0,0 +1,58 @@
+from app.services.autocomplete import AutocompleteIndex
+
+def build_index(snapshot_path=None):
+    index = AutocompleteIndex(snapshot_path)
+    index.add_track(1, "Blinding Lights", "The Weeknd", "After Hours", 95)
+    index.add_track(2, "Save Your Tears", "The Weeknd", "After Hours", 90)
+    index.add_track(3, "Bad Habits", "Ed Sheeran", "=", 88)
+    index.add_track(4, "Beyoncé Medley", "Beyoncé", None, 40)
+    return index
+
+def test_complete_ranks_by_popularity():
+    index = build_index()
+
+    assert index.complete("b", 3) == [
+        {"text": "Blinding Lights", "type": "track", "track_id": 1},
+        {"text": "Bad Habits", "type": "track", "track_id": 3},
+        {"text": "Beyoncé", "type": "artist", "track_id": None},
+    ]
+
+def test_complete_matches_word_starts_and_ignores_accents():
+    index = build_index()
+
+    assert {"text": "The Weeknd", "type": "artist", "track_id": None} in index.complete("weekn")
+    assert [s["text"] for s in index.complete("BEYONCE ")] == ["Beyoncé", "Beyoncé Medley"]
+    assert index.complete("zzz") == []
+
+def test_new_tracks_invalidate_memoized_prefixes():
+    index = build_index()
+    assert index.complete("ba")[0]["text"] == "Bad Habits"
+
+    index.add_track(5, "Bad Guy", "Billie Eilish", None, 99)
+
+    assert index.complete("ba")[0]["text"] == "Bad Guy"
+
+def test_snapshot_round_trip(tmp_path):
+    snapshot_path = str(tmp_path / "autocomplete.json")
+    index = build_index(snapshot_path)
+    index.last_track_id = 4
+    index.save()
+
+    restored = AutocompleteIndex(snapshot_path)
+    restored._restore(snapshot_path)
+
+    assert restored.last_track_id == 4
+    assert restored.complete("after") == index.complete("after")
+    restored.add_track(2, "Save Your Tears", "The Weeknd", "After Hours", 90)
+    assert len(restored.complete("save")) == 1
+
+def test_large_batches_are_merged_into_the_sorted_keys():
+    index = build_index()
+    rows = [(track_id, f"Song {track_id}", f"Artist {track_id % 7}", None, track_id % 100) for track_id in range(5, 205)]
+
+    index.add_tracks(rows)
+
+    assert index._keys == sorted(index._keys)
+    assert len(index._keys) == len(index._key_entries)
+    assert index.complete("song 19", 1) == [{"text": "Song 199", "type": "track", "track_id": 199}]
+    assert index.complete("blinding")[0]["track_id"] == 1
@@ -0,0 +1,251 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict
+
+import pytest
+
+from app.core.config import settings
+from app.utils import cache as cache_module
+from app.utils.cache import CacheService, LocalCache, cached
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_local_cache_entries_expire():
+    cache = LocalCache(max_entries=10, ttl_seconds=60)
+    cache.set("short", "value", expire=1)
+    cache._entries["short"] = (time.monotonic() - 1, "value", ())
+
+    assert cache.get("short") is None
+    assert len(cache) == 0
+
+def test_local_ttl_never_exceeds_the_l1_limit():
+    cache = LocalCache(max_entries=10, ttl_seconds=5)
+    cache.set("key", "value", expire=3600)
+
+    assert cache._entries["key"][0] <= time.monotonic() + 5
+
+def test_l1_serves_values_in_their_decoded_form():
+    cache = CacheService()
+
+    asyncio.run(cache.set("trending_tracks", [{"played_at": datetime(2025, 1, 1)}]))
+
+    assert asyncio.run(cache.get("trending_tracks")) == [{"played_at": datetime(2025, 1, 1)}]
+
+def test_invalidations_from_other_workers_drop_l1_entries():
+    cache = CacheService()
+    cache.local.set("user_playlists:1", ["mine"])
+    cache.local.set("user_playlists:2", ["theirs"])
+
+    channel = settings.CACHE_INVALIDATION_CHANNEL.encode()
+    cache._on_invalidation({"channel": channel, "data": f"{cache.instance_id}:user_playlists:1".encode()})
+    cache._on_invalidation({"channel": channel, "data": b"another-worker:user_playlists:2"})
+
+    assert cache.local.get("user_playlists:1") == ["mine"]
+    assert cache.local.get("user_playlists:2") is None
+
+def test_unreachable_redis_backs_off_and_falls_back_to_l1(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:1")
+    cache = CacheService()
+
+    async def scenario():
+        await cache.connect()
+        try:
+            assert not cache.enabled
+            assert await cache.set("trending_tracks", ["track"]) is True
+            return await cache.get("trending_tracks"), await cache.get("missing")
+        finally:
+            await cache.close()
+
+    started = time.monotonic()
+    assert asyncio.run(scenario()) == (["track"], None)
+    assert time.monotonic() - started < 2
+    assert cache._backoff == settings.CACHE_RECONNECT_BACKOFF_SECONDS
+
+def test_concurrent_misses_compute_once():
+    cache = CacheService()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["track"]
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("trending_tracks", compute, expire=60) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == [["track"]] * 10
+    assert len(calls) == 1
+
+def test_stale_values_are_served_while_one_refresh_runs():
+    cache = CacheService()
+    cache.local.set("trending_tracks", {"v": ["old"], "t": 0.1, "e": time.time() - 5})
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return ["new"]
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get_or_compute("trending_tracks", compute, 60, stale_ttl=30) for _ in range(5)))
+        await asyncio.sleep(0)
+        return first, await cache.get_or_compute("trending_tracks", compute, 60, stale_ttl=30)
+
+    first, after_refresh = asyncio.run(scenario())
+    assert first == [["old"]] * 5
+    assert after_refresh == ["new"]
+    assert len(calls) == 1
+
+def test_values_past_the_stale_window_are_recomputed():
+    cache = CacheService()
+    cache.local.set("trending_tracks", {"v": ["old"], "t": 0.1, "e": time.time() - 60})
+
+    async def compute():
+        return ["new"]
+
+    assert asyncio.run(cache.get_or_compute("trending_tracks", compute, 60, stale_ttl=30)) == ["new"]
+
+def test_slow_computes_are_refreshed_early():
+    cache = CacheService()
+    # Ten seconds left, but compute is far slower than that: XFetch refreshes ahead of expiry
+    cache.local.set("trending_tracks", {"v": ["old"], "t": 10 ** 7, "e": time.time() + 10})
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return ["new"]
+
+    async def scenario():
+        value = await cache.get_or_compute("trending_tracks", compute, 60)
+        await asyncio.sleep(0)
+        return value
+
+    assert asyncio.run(scenario()) == ["old"]
+    assert calls == [1]
+
+def test_local_tags_drop_every_tagged_entry():
+    cache = LocalCache(max_entries=10, ttl_seconds=60)
+    cache.set("playlist_detail", "detail", tags=["playlist:1"])
+    cache.set("playlist_list", "list", tags=["playlist:1", "user:1:playlists"])
+    cache.set("other", "other", tags=["playlist:2"])
+
+    cache.delete_tag("playlist:1")
+
+    assert cache.get("playlist_detail") is None
+    assert cache.get("playlist_list") is None
+    assert cache.get("other") == "other"
+    assert set(cache._tagged) == {"playlist:2"}
+
+def test_tag_invalidations_from_other_workers_drop_l1_entries():
+    cache = CacheService()
+    cache.local.set("endpoint:a", "a", tags=["user:1"])
+
+    cache._on_invalidation({"channel": cache._tag_channel.encode(), "data": b"another-worker:user:1"})
+
+    assert cache.local.get("endpoint:a") is None
+
+def test_cached_endpoint_is_keyed_by_parameters_and_invalidated_by_tag(monkeypatch):
+    service = CacheService()
+    monkeypatch.setattr(cache_module, "cache_service", service)
+    calls = []
+
+    class Row:
+        __table__ = object()
+        def __init__(self, id):
+            self.id = id
+
+    @cached(Dict[str, int], tags=["playlist:{playlist_id}", "user:{current_user.id}:playlists"])
+    async def endpoint(playlist_id: int, current_user, db=None):
+        calls.append(playlist_id)
+        return {"playlist_id": playlist_id, "user_id": current_user.id}
+
+    async def scenario():
+        first = await endpoint(playlist_id=1, current_user=Row(5), db=object())
+        again = await endpoint(playlist_id=1, current_user=Row(5), db=object())
+        other = await endpoint(playlist_id=2, current_user=Row(5), db=object())
+        await service.invalidate_tags("playlist:1")
+        after_write = await endpoint(playlist_id=1, current_user=Row(5), db=object())
+        return first, again, other, after_write
+
+    first, again, other, after_write = asyncio.run(scenario())
+    assert first == again == after_write == {"playlist_id": 1, "user_id": 5}
+    assert other == {"playlist_id": 2, "user_id": 5}
+    assert calls == [1, 2, 1]
+
+def test_l1_is_cleared_once_when_the_listener_resubscribes(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_RECONNECT_BACKOFF_SECONDS", 0)
+    service = CacheService()
+    # Connected, dropped; two failed resubscribes; connected again
+    sessions = []
+    clears = []
+    clear = service.local.clear
+
+    def counting_clear():
+        clears.append(len(sessions))
+        clear()
+
+    monkeypatch.setattr(service.local, "clear", counting_clear)
+    outcomes = iter(["drop", "fail", "fail", "stay"])
+
+    class FakePubSub:
+        def __init__(self):
+            self.outcome = next(outcomes)
+            sessions.append(self.outcome)
+
+        async def subscribe(self, *channels):
+            if self.outcome == "fail":
+                raise ConnectionError("refused")
+
+        async def get_message(self, **kwargs):
+            if self.outcome == "drop":
+                raise ConnectionError("connection lost")
+            raise asyncio.CancelledError
+
+        async def reset(self):
+            pass
+
+    class FakeRedis:
+        def pubsub(self, **kwargs):
+            return FakePubSub()
+
+    service.redis_client = FakeRedis()
+    try:
+        asyncio.run(service._listen_for_invalidations())
+    except asyncio.CancelledError:
+        pass
+
+    assert sessions == ["drop", "fail", "fail", "stay"]
+    assert clears == [4]
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+def test_tag_invalidation_reaches_l1_copies_filled_from_redis(shared_redis_services):
+    writer, reader = shared_redis_services(2)
+
+    async def scenario():
+        listener = asyncio.create_task(reader._listen_for_invalidations())
+        try:
+            await asyncio.sleep(0.05)
+            await writer.set("playlist_detail:7", {"name": "old"}, tags=["playlist:7"])
+            # The reader fills its L1 from Redis, without the entry's tags
+            assert await reader.get("playlist_detail:7") == {"name": "old"}
+
+            await writer.invalidate_tags("playlist:7")
+            await wait_until(lambda: reader.local.get("playlist_detail:7") is None)
+            return await reader.get("playlist_detail:7")
+        finally:
+            listener.cancel()
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+
+from app.core.config import settings
+from app.services import cache_warmer as cache_warmer_module
+from app.services.cache_warmer import CacheWarmer, hits_key
+from app.utils.cache import cache_service
+
+def make_warmer(produced):
+    warmer = CacheWarmer()
+
+    async def trending():
+        produced.append("trending")
+        return ["track"]
+
+    async def playlist(playlist_id):
+        produced.append(f"playlist:{playlist_id}")
+        return {"id": playlist_id} if playlist_id >= 0 else None
+
+    warmer.register("warm_test_trending", trending, expire=1800)
+    warmer.register("warm_test_playlist", playlist, expire=300, tags=("playlist:{0}",), parameterized=True)
+    return warmer
+
+def test_warm_refreshes_the_most_requested_entries_first(monkeypatch):
+    cache_service.local.clear()
+    produced = []
+    warmer = make_warmer(produced)
+
+    async def scenario():
+        await warmer.get("warm_test_playlist", 7)
+        for _ in range(3):
+            await warmer.get("warm_test_playlist", 8)
+        cache_service.local.clear()
+        produced.clear()
+        return await warmer.warm()
+
+    warmed = asyncio.run(scenario())
+    assert warmed == ["warm_test_playlist:8", "warm_test_playlist:7", "warm_test_trending"]
+    assert produced == ["playlist:8", "playlist:7", "trending"]
+
+def test_fresh_entries_are_left_alone():
+    cache_service.local.clear()
+    produced = []
+    warmer = make_warmer(produced)
+
+    async def scenario():
+        first = await warmer.warm()
+        second = await warmer.warm()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ["warm_test_trending"]
+    assert second == []
+    assert produced == ["trending"]
+
+def test_parameterized_entries_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_WARM_MAX_KEYS", 2)
+    cache_service.local.clear()
+    produced = []
+    warmer = make_warmer(produced)
+
+    async def scenario():
+        for playlist_id in range(5):
+            for _ in range(playlist_id + 1):
+                await warmer.get("warm_test_playlist", playlist_id)
+        cache_service.local.clear()
+        return await warmer.warm()
+
+    assert asyncio.run(scenario()) == ["warm_test_playlist:4", "warm_test_playlist:3", "warm_test_trending"]
+
+def test_warmed_entries_carry_their_tags():
+    cache_service.local.clear()
+    warmer = make_warmer([])
+
+    async def scenario():
+        await warmer.get("warm_test_playlist", 9)
+        await cache_service.invalidate_tags("playlist:9")
+        return cache_service.local.get("warm_test_playlist:9")
+
+    assert asyncio.run(scenario()) is None
+
+def test_misses_are_neither_cached_nor_warmed():
+    cache_service.local.clear()
+    produced = []
+    warmer = make_warmer(produced)
+
+    async def scenario():
+        for _ in range(3):
+            assert await warmer.get("warm_test_playlist", -1) is None
+        return await warmer.warm()
+
+    assert asyncio.run(scenario()) == ["warm_test_trending"]
+    assert produced == ["playlist:-1"] * 3 + ["trending"]
+    assert cache_service.local.get("warm_test_playlist:-1") is None
+
+def test_plan_ranks_by_the_previous_interval_only(shared_redis_services, monkeypatch):
+    service, = shared_redis_services(1)
+    monkeypatch.setattr(cache_warmer_module, "cache_service", service)
+    monkeypatch.setattr(settings, "CACHE_WARM_MAX_KEYS", 2)
+    produced = []
+    warmer = make_warmer(produced)
+    interval = int(time.time() // settings.CACHE_WARM_INTERVAL_SECONDS)
+
+    async def scenario():
+        client = service.redis_client
+        # Hot long ago, hot in the previous interval, and requested by this worker just now
+        await client.zincrby(hits_key(interval - 2), 100, json.dumps(["warm_test_playlist", 1]))
+        await client.zincrby(hits_key(interval - 1), 5, json.dumps(["warm_test_playlist", 2]))
+        await client.zincrby(hits_key(interval - 1), 3, json.dumps(["warm_test_playlist", 3]))
+        await warmer.get("warm_test_playlist", 4)
+        produced.clear()
+        warmed = await warmer.warm()
+        current = await client.zrange(hits_key(interval), 0, -1, withscores=True)
+        return warmed, current
+
+    warmed, current = asyncio.run(scenario())
+    assert warmed == ["warm_test_playlist:2", "warm_test_playlist:3", "warm_test_trending"]
+    assert current == [(json.dumps(["warm_test_playlist", 4]).encode(), 1.0)]
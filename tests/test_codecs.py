@@ -0,0 +1,53 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.utils.codecs import CODECS, HEADER_FLAG, PayloadCodec
+
+VALUE = {"tracks": [{"id": i, "title": f"Track {i}", "artist": "Artist"} for i in range(50)], "count": 50}
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_every_available_codec_round_trips(codec):
+    payload_codec = PayloadCodec(codec, "none")
+
+    assert payload_codec.decode(payload_codec.encode(VALUE)) == VALUE
+
+def test_large_payloads_are_compressed_and_small_ones_are_not():
+    payload_codec = PayloadCodec("json", "zlib", compress_min_bytes=256)
+    small, large = payload_codec.encode({"id": 1}), payload_codec.encode(VALUE)
+
+    assert small[0] & 0xF == 0
+    assert large[0] & 0xF == 1
+    assert len(large) < len(json.dumps(VALUE))
+    assert payload_codec.decode(large) == VALUE
+
+def test_values_stay_readable_after_the_codec_changes():
+    old = PayloadCodec("json", "zlib", compress_min_bytes=0).encode(VALUE)
+    legacy = json.dumps(VALUE).encode()
+
+    new_codec = PayloadCodec("orjson" if "orjson" in CODECS else "json", "none")
+    assert new_codec.decode(old) == VALUE
+    assert new_codec.decode(legacy) == VALUE
+    assert old[0] & HEADER_FLAG and not legacy[0] & HEADER_FLAG
+
+def test_unavailable_choices_fall_back_to_json():
+    payload_codec = PayloadCodec("nonexistent", "nonexistent")
+
+    assert payload_codec.codec is CODECS["json"]
+    assert payload_codec.decode(payload_codec.encode(VALUE)) == VALUE
+
+def test_msgpack_keeps_datetimes():
+    pytest.importorskip("msgpack")
+    payload_codec = PayloadCodec("msgpack", "none")
+    value = {"created_at": datetime(2025, 1, 1, 12, 30)}
+
+    assert payload_codec.decode(payload_codec.encode(value)) == value
+
+def test_datetimes_survive_the_default_codec():
+    payload_codec = PayloadCodec(settings.CACHE_CODEC, settings.CACHE_COMPRESSION, compress_min_bytes=0)
+    value = {"rows": [{"id": i, "created_at": datetime(2025, 1, 1, 12, i)} for i in range(50)]}
+
+    assert payload_codec.codec is CODECS["msgpack"]
+    assert payload_codec.decode(payload_codec.encode(value)) == value
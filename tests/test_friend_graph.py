@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.models.user import Friendship
+from app.services.friend_graph import FriendGraph
+from app.utils.cache import cache_service
+
+EDGES = [(1, 2), (1, 3), (2, 3), (2, 4), (3, 4), (3, 5), (4, 6)]
+
+@pytest.fixture
+def db(db):
+    for a, b in EDGES:
+        db.add(Friendship(user_low_id=a, user_high_id=b, requester_id=a, status="accepted"))
+    db.add(Friendship(user_low_id=1, user_high_id=9, requester_id=1, status="pending"))
+    db.commit()
+    return db
+
+def test_mutual_friends_and_counts(db):
+    graph = FriendGraph()
+
+    assert graph.mutual_friends(db, 1, 4) == [2, 3]
+    assert graph.friend_count(db, 3) == 4
+    assert graph.friend_count(db, 9) == 0
+
+def test_suggestions_ranked_by_overlap(db, statements):
+    graph = FriendGraph()
+
+    assert graph.suggestions(db, 1) == [(4, 2), (5, 1)]
+    # One query for user 1, one batched query for all of their friends
+    assert len(statements) == 2
+
+    statements.clear()
+    graph.suggestions(db, 1)
+    assert statements == []
+
+def test_edges_are_patched_in_place(db):
+    graph = FriendGraph()
+    graph.suggestions(db, 1)
+    graph.friends_of(db, 4)
+
+    asyncio.run(graph.add_edge(1, 4))
+    assert graph.friends_of(db, 4) == {1, 2, 3, 6}
+    assert graph.suggestions(db, 1) == [(5, 1), (6, 1)]
+
+    asyncio.run(graph.remove_edge(1, 2))
+    assert 2 not in graph.friends_of(db, 1)
+    assert 1 not in graph.friends_of(db, 2)
+
+def test_lru_bound(db):
+    graph = FriendGraph(max_users=2)
+    for user_id in (1, 2, 3):
+        graph.friends_of(db, user_id)
+    assert list(graph._adjacency) == [2, 3]
+
+def test_friends_of_is_a_snapshot(db):
+    graph = FriendGraph()
+    friends = graph.friends_of(db, 1)
+
+    asyncio.run(graph.add_edge(1, 6))
+    assert friends == {2, 3}
+    assert graph.friends_of(db, 1) == {2, 3, 6}
+
+def test_edge_changes_on_other_workers_drop_both_users(db):
+    graph = FriendGraph()
+    for user_id in (1, 2, 3):
+        graph.friends_of(db, user_id)
+
+    graph.on_message(f"{cache_service.instance_id}:1,2")
+    assert list(graph._adjacency) == [1, 2, 3]
+
+    graph.on_message("another-worker:1,2")
+    assert list(graph._adjacency) == [3]
+
+    graph.on_message(None)
+    assert list(graph._adjacency) == []
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.api.v1.endpoints import friends as friends_endpoint
+from app.core.principal import Principal
+from app.models.user import User, Friendship
+from app.schemas.user import NowPlaying
+from app.services.friend_graph import FriendGraph
+from app.services.friends import FriendRepository
+from app.websocket.manager import manager
+
+def add_users(db, count):
+    users = [User(email=f"user{i}@example.com", username=f"user{i}", hashed_password="x") for i in range(count)]
+    db.add_all(users)
+    db.commit()
+    return users
+
+def test_list_friends_is_a_single_query_per_page(db, statements):
+    me, *others = add_users(db, 6)
+    # Friends on both sides of the canonical pair ordering
+    db.add_all([
+        Friendship(user_low_id=me.id, user_high_id=other.id, requester_id=other.id, status="accepted")
+        for other in others[1:]
+    ])
+    db.add(Friendship(user_low_id=me.id, user_high_id=others[0].id, requester_id=others[0].id, status="pending"))
+    db.add(Friendship(user_low_id=others[1].id, user_high_id=others[2].id, requester_id=others[1].id, status="pending"))
+    stranger = User(email="stranger@example.com", username="stranger", hashed_password="x")
+    db.add(stranger)
+    db.flush()
+    db.add(Friendship(user_low_id=me.id, user_high_id=stranger.id, requester_id=me.id, status="pending"))
+    db.commit()
+    my_id = me.id
+    statements.clear()
+
+    repository = FriendRepository(db)
+    page, cursor = repository.list_friends(my_id, limit=3)
+
+    assert len(statements) == 1
+    assert [friend["friend_username"] for friend in page] == ["user2", "user3", "user4"]
+    assert cursor is not None
+
+    page, cursor = repository.list_friends(my_id, limit=3, cursor=cursor)
+    assert [friend["friend_username"] for friend in page] == ["user5"]
+    assert cursor is None
+
+    requests, _ = repository.list_incoming_requests(my_id, limit=10)
+    assert [request["friend_username"] for request in requests] == ["user1"]
+
+def test_pair_lookup_is_order_independent(db):
+    me, other = add_users(db, 2)
+    db.add(Friendship(user_low_id=me.id, user_high_id=other.id, requester_id=other.id, status="pending"))
+    db.commit()
+
+    repository = FriendRepository(db)
+    friendship = repository.get_between(other.id, me.id)
+
+    assert friendship is repository.get_between(me.id, other.id)
+    assert repository.get_incoming_request(friendship.id, me.id) is friendship
+    assert repository.get_incoming_request(friendship.id, other.id) is None
+
+def test_list_friends_includes_presence_on_request(db):
+    me, friend = add_users(db, 2)
+    db.add(Friendship(user_low_id=me.id, user_high_id=friend.id, requester_id=me.id, status="accepted"))
+    db.commit()
+
+    manager.user_connections[friend.id] = []
+    manager.set_now_playing(friend.id, NowPlaying(title="Heat Waves"))
+    try:
+        page, _ = FriendRepository(db).list_friends(me.id, limit=10, include={"presence", "now_playing"})
+    finally:
+        manager.user_connections.pop(friend.id, None)
+        manager.set_now_playing(friend.id, None)
+
+    assert page[0]["is_online"] is True
+    assert page[0]["now_playing"] == {"title": "Heat Waves"}
+    assert "is_online" not in FriendRepository(db).list_friends(me.id, limit=10)[0][0]
+
+def test_friend_counts_and_mutual_friends_are_limited_to_self_and_friends(db, monkeypatch):
+    me, friend, stranger = add_users(db, 3)
+    db.add(Friendship(user_low_id=me.id, user_high_id=friend.id, requester_id=me.id, status="accepted"))
+    db.commit()
+    monkeypatch.setattr(friends_endpoint, "friend_graph", FriendGraph())
+    principal = Principal(me.id, me.username)
+
+    assert asyncio.run(friends_endpoint.get_friend_count(None, principal, db))["friend_count"] == 1
+    assert asyncio.run(friends_endpoint.get_friend_count(friend.id, principal, db))["friend_count"] == 1
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(friends_endpoint.get_friend_count(stranger.id, principal, db))
+    assert excinfo.value.status_code == 403
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(friends_endpoint.get_mutual_friends(stranger.id, principal, db, loaders=None))
+    assert excinfo.value.status_code == 403
+
+    # Unfriended on another worker: this worker's friend graph still has the edge
+    db.query(Friendship).delete()
+    db.commit()
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(friends_endpoint.get_friend_count(friend.id, principal, db))
+    assert excinfo.value.status_code == 403
+
+def test_now_playing_accepts_only_known_bounded_fields():
+    track = NowPlaying.model_validate({"title": "Heat Waves", "artist": "Glass Animals", "duration_ms": 238805})
+    assert track.model_dump(exclude_none=True) == {"title": "Heat Waves", "artist": "Glass Animals", "duration_ms": 238805}
+
+    for payload in (
+        {"title": "Heat Waves", "lyrics": "..."},
+        {"title": "x" * 201},
+        {"artist": "Glass Animals"},
+        {"title": "Heat Waves", "duration_ms": -1},
+        "Heat Waves",
+    ):
+        with pytest.raises(ValidationError):
+            NowPlaying.model_validate(payload)
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.models.user import User
+from app.utils.cache import cache_service
+from app.utils.loaders import Loaders
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Every test builds its own database with the same ids
+    cache_service.local.clear()
+    yield
+    cache_service.local.clear()
+
+def add_users(db, count):
+    db.add_all([User(email=f"user{i}@example.com", username=f"user{i}", hashed_password="x") for i in range(count)])
+    db.commit()
+
+def test_concurrent_loads_are_coalesced_into_one_query(db, statements):
+    add_users(db, 3)
+    loaders = Loaders(db)
+    statements.clear()
+
+    async def load_all():
+        return await asyncio.gather(*(loaders.users.load(user_id) for user_id in (3, 1, 99, 1)))
+
+    users = asyncio.run(load_all())
+
+    assert [user.id if user else None for user in users] == [3, 1, None, 1]
+    assert len(statements) == 1
+
+def test_load_many_preserves_order_and_memoizes(db, statements):
+    add_users(db, 3)
+    loaders = Loaders(db)
+    statements.clear()
+
+    async def load_twice():
+        first = await loaders.users.load_many([2, 3, 2])
+        second = await loaders.users.load_many([3, 2])
+        return first, second
+
+    first, second = asyncio.run(load_twice())
+
+    assert [user.id for user in first] == [2, 3, 2]
+    assert [user.id for user in second] == [3, 2]
+    assert len(statements) == 1
+
+def test_cached_rows_skip_the_database_in_later_requests(db, statements):
+    add_users(db, 3)
+    statements.clear()
+
+    first = asyncio.run(Loaders(db).users.load_many([1, 2]))
+    second = asyncio.run(Loaders(db).users.load_many([1, 2, 3]))
+
+    assert [user.username for user in second] == ["user0", "user1", "user2"]
+    assert second[0].hashed_password is None
+    assert first[0].hashed_password == "x"
+    # The second request only queried the id that was not cached yet
+    assert len(statements) == 2
+
+def test_committed_changes_invalidate_cached_rows(db):
+    add_users(db, 1)
+    asyncio.run(Loaders(db).users.load(1))
+
+    user = db.get(User, 1)
+    user.full_name = "Renamed"
+    db.commit()
+
+    assert asyncio.run(Loaders(db).users.load(1)).full_name == "Renamed"
@@ -0,0 +1,64 @@
+from alembic import command
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.migrations import get_alembic_config, check_schema_revision
+
+def test_upgrade_to_head_on_empty_database(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    config = get_alembic_config()
+    config.set_main_option("sqlalchemy.url", database_url)
+
+    command.upgrade(config, "head")
+
+    engine = create_engine(database_url)
+    check_schema_revision(engine)
+    index_names = [index["name"] for index in inspect(engine).get_indexes("friendships")]
+    assert "ux_friendships_pair" in index_names
+
+def test_canonical_friendships_migration_collapses_reciprocal_rows(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'friendships.db'}"
+    config = get_alembic_config()
+    config.set_main_option("sqlalchemy.url", database_url)
+    command.upgrade(config, "0004")
+
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        for user_id in (1, 2, 3, 4):
+            connection.execute(
+                text("INSERT INTO users (id, email, username, hashed_password) VALUES (:id, :email, :username, 'x')"),
+                {"id": user_id, "email": f"user{user_id}@example.com", "username": f"user{user_id}"}
+            )
+        connection.execute(text("""
+            INSERT INTO friendships (id, user_id, friend_id, status) VALUES
+                (1, 1, 2, 'accepted'),
+                (2, 2, 1, 'accepted'),
+                (3, 4, 3, 'pending'),
+                (4, 1, 3, 'pending'),
+                (5, 3, 1, 'accepted')
+        """))
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT user_low_id, user_high_id, requester_id, status FROM friendships ORDER BY id"
+        )).all()
+    assert [tuple(row) for row in rows] == [
+        (1, 2, 1, "accepted"),
+        (3, 4, 4, "pending"),
+        (1, 3, 1, "accepted"),
+    ]
+
+    command.downgrade(config, "0004")
+
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT user_id, friend_id, status FROM friendships")).all()
+        index_names = [index["name"] for index in inspect(connection).get_indexes("friendships")]
+    assert sorted(tuple(row) for row in rows) == [
+        (1, 2, "accepted"),
+        (1, 3, "accepted"),
+        (2, 1, "accepted"),
+        (3, 1, "accepted"),
+        (4, 3, "pending"),
+    ]
+    assert "ix_friendships_user_id_status_id" in index_names
@@ -0,0 +1,57 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.outbound_quota import OutboundQuota, QuotaExceeded
+from app.services.spotify import SpotifyService
+from main import app
+
+def test_waiting_users_get_an_equal_share():
+    quotas = OutboundQuota({"spotify": 4}, window=10)
+    quota = quotas.platforms["spotify"]
+    now = time.monotonic()
+
+    quota.waiting = Counter({1: 1, 2: 1})
+    assert [quotas._take(quota, 1, "read", now) for _ in range(2)] == [0, 0]
+    assert quotas._take(quota, 1, "read", now) > 0
+    assert quotas._take(quota, 2, "search", now) == 0
+
+    # Alone, a user may use whatever budget is left
+    quota.waiting = Counter({1: 1})
+    assert quotas._take(quota, 1, "write", now) == 0
+    assert quotas._take(quota, 1, "read", now) == pytest.approx(10)
+
+    usage = quotas.usage(2)["spotify"]
+    assert usage["calls_by_class"] == {"search": 1}
+    assert (usage["app_calls"], usage["app_limit"]) == (4, 4)
+
+def test_calls_that_would_wait_too_long_fail():
+    quotas = OutboundQuota({"spotify": 1}, window=60, max_wait=0.1)
+
+    async def two_calls():
+        await quotas.acquire("spotify", 1)
+        await quotas.acquire("spotify", 2)
+
+    with pytest.raises(QuotaExceeded) as error:
+        asyncio.run(two_calls())
+    assert error.value.retry_after > 59
+    assert not quotas.platforms["spotify"].waiting
+
+def test_exhausted_quota_reaches_the_client_as_429(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    client = TestClient(app)
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    user = client.post("/api/v1/auth/register", json={"email": email, "username": email[:12], "password": "testpassword123"}).json()
+
+    async def exhausted(self, code):
+        raise QuotaExceeded("spotify", 12.3)
+
+    monkeypatch.setattr(SpotifyService, "get_access_token", exhausted)
+    response = client.get("/api/v1/auth/spotify/callback", params={"code": "abc", "state": user["id"]})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "13"
@@ -0,0 +1,45 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models.music import Track
+from app.utils.pagination import decode_cursor, encode_cursor, paginate
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([-1.25, 42])
+    assert decode_cursor(cursor, (float, int)) == [-1.25, 42]
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    encode_cursor([1]),
+    encode_cursor({"id": 1}),
+    encode_cursor([1.5, {"x": 1}]),
+    encode_cursor([1.5, "abc"]),
+    encode_cursor([1.5, 2.5]),
+    encode_cursor(["abc", 1]),
+    encode_cursor([1.5, True]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, (float, int))
+    assert exc_info.value.status_code == 400
+
+def test_paginate_rejects_cursor_values_of_the_wrong_type(db):
+    with pytest.raises(HTTPException) as exc_info:
+        paginate(db.query(Track), [(Track.id, False)], encode_cursor([{"x": 1}]), 10, lambda t: [t.id])
+    assert exc_info.value.status_code == 400
+
+def test_paginate_walks_every_row_once_with_mixed_directions(db):
+    db.add_all([Track(title=f"Track {i}", artist="Artist", popularity=i % 3) for i in range(10)])
+    db.commit()
+
+    order_by = [(Track.popularity, True), (Track.id, False)]
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = paginate(db.query(Track), order_by, cursor, 4, lambda t: [t.popularity, t.id])
+        seen.extend((t.popularity, t.id) for t in page)
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen, key=lambda key: (-key[0], key[1]))
+    assert len(seen) == 10
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHasherPool, get_password_hash, verify_password
+
+def test_hashing_runs_off_the_event_loop():
+    pool = PasswordHasherPool(workers=1, max_pending=4)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        hashed = await pool.run(get_password_hash, "secret")
+        valid = await pool.run(verify_password, "secret", hashed)
+        task.cancel()
+        return valid, ticks
+
+    valid, ticks = asyncio.run(scenario())
+    assert valid is True
+    assert ticks > 0
+    assert pool.stats()["completed"] == 2
+
+def test_saturated_pool_rejects_with_503():
+    pool = PasswordHasherPool(workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.stats()["pending"] == 2
+        assert pool.stats()["queued"] == 1
+        with pytest.raises(HTTPException) as error:
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["pending"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core import principal
+from app.core.principal import PrincipalCache
+from app.models.user import User
+from app.utils import loaders  # noqa: F401  (registers the commit hook that invalidates user:<id>)
+from app.utils.cache import cache_service
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache_service.local.clear()
+    yield
+    cache_service.local.clear()
+
+@pytest.fixture
+def db(db):
+    db.add(User(email="ada@example.com", username="ada", hashed_password="x"))
+    db.commit()
+    return db
+
+def test_principal_is_cached_until_the_user_changes(db, statements):
+    principals = PrincipalCache(ttl_seconds=60)
+
+    first = asyncio.run(principals.resolve({"sub": "1"}, db))
+    second = asyncio.run(principals.resolve({"sub": "1"}, db))
+    assert (second.id, second.username) == (1, "ada")
+    assert len(statements) == 1
+
+    user = db.get(User, first.id)
+    user.username = "lovelace"
+    db.commit()
+    assert asyncio.run(principals.resolve({"sub": "1"}, db)).username == "lovelace"
+
+def test_deactivated_user_is_rejected_immediately(db):
+    principals = PrincipalCache(ttl_seconds=60)
+    asyncio.run(principals.resolve({"sub": "1"}, db))
+
+    db.get(User, 1).is_active = False
+    db.commit()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(principals.resolve({"sub": "1"}, db))
+    assert error.value.status_code == 400
+
+def test_token_claims_skip_the_lookup(db, statements, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TOKEN_CLAIMS", True)
+
+    user = asyncio.run(PrincipalCache().resolve({"sub": "7", "username": "grace", "active": True}, db))
+    assert (user.id, user.username) == (7, "grace")
+    assert statements == []
+
+def test_a_request_is_authenticated_once(db, statements, monkeypatch):
+    request = Request({"type": "http", "headers": []})
+    decoded = []
+    monkeypatch.setattr(principal, "decode_token", lambda token: decoded.append(token) or {"sub": "1"})
+
+    async def resolve_twice():
+        return [await principal.authenticate(request, "token", db) for _ in range(2)]
+
+    first, second = asyncio.run(resolve_twice())
+    assert first is second
+    assert decoded == ["token"]
+    assert len(statements) == 1
+
+def test_deactivation_on_one_worker_reaches_the_others(db, shared_redis_services, monkeypatch):
+    worker_a, worker_b = shared_redis_services(2)
+    principals = PrincipalCache(ttl_seconds=60)
+
+    async def resolve_on(worker):
+        monkeypatch.setattr(principal, "cache_service", worker)
+        return await principals.resolve({"sub": "1"}, db)
+
+    async def scenario():
+        listener = asyncio.create_task(worker_b._listen_for_invalidations())
+        try:
+            await asyncio.sleep(0.05)
+            await resolve_on(worker_a)
+            # Worker B fills its L1 from Redis
+            assert (await resolve_on(worker_b)).is_active
+            assert worker_b.local.get("principal:1") is not None
+
+            db.get(User, 1).is_active = False
+            db.commit()
+            await worker_a.invalidate_tags("user:1")
+            for _ in range(200):
+                if worker_b.local.get("principal:1") is None:
+                    break
+                await asyncio.sleep(0.01)
+            await resolve_on(worker_b)
+        finally:
+            listener.cancel()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 400
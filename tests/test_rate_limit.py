@@ -0,0 +1,100 @@
+import asyncio
+import ipaddress
+
+from fastapi import FastAPI
+from starlette.requests import Request
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.middleware import rate_limit
+from app.middleware.rate_limit import RateLimiter, RateLimitMiddleware
+
+def test_limits_fall_back_to_local_counters_without_redis():
+    limiter = RateLimiter()
+
+    async def hits(count):
+        return [await limiter.check("10.0.0.1", "auth") for _ in range(count)]
+
+    results = asyncio.run(hits(6))
+    assert [result.allowed for result in results] == [True] * 5 + [False]
+    assert [result.remaining for result in results[:5]] == [4, 3, 2, 1, 0]
+    assert 0 < results[-1].retry_after <= 60
+    assert asyncio.run(limiter.check("10.0.0.2", "auth")).allowed
+
+def test_local_limiter_memory_stays_flat_under_scanning_traffic():
+    limiter = RateLimiter(max_local_keys=100)
+
+    for i in range(10000):
+        assert limiter.is_allowed(f"10.{i // 256}.{i % 256}.1")
+    assert len(limiter.arrivals) == 100
+    assert limiter.is_allowed("10.0.0.1")
+    assert list(limiter.arrivals)[-1] == "api:10.0.0.1"
+
+def test_idle_keys_are_evicted(monkeypatch):
+    limiter = RateLimiter()
+    clock = [1000.0]
+    monkeypatch.setattr("app.middleware.rate_limit.time.monotonic", lambda: clock[0])
+
+    assert limiter.is_allowed("10.0.0.1", "sync")
+    clock[0] += 31
+    assert limiter.is_allowed("10.0.0.2", "sync")
+    assert list(limiter.arrivals) == ["sync:10.0.0.2"]
+
+def make_app(limiter):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    calls = []
+
+    @app.post("/api/v1/auth/login")
+    async def login(body: dict):
+        calls.append(body)
+        return {}
+
+    @app.get("/api/v1/items")
+    async def items():
+        return []
+
+    return TestClient(app), calls
+
+def test_middleware_applies_route_policies_before_the_endpoint():
+    client, calls = make_app(RateLimiter())
+
+    responses = [client.post("/api/v1/auth/login", json={"n": n}) for n in range(6)]
+    assert [response.status_code for response in responses] == [200] * 5 + [429]
+    assert len(calls) == 5
+    assert responses[0].headers["RateLimit-Limit"] == "5"
+    assert responses[4].headers["RateLimit-Remaining"] == "0"
+    assert int(responses[5].headers["Retry-After"]) > 0
+    # Other routes have their own, larger budget
+    assert client.get("/api/v1/items").headers["RateLimit-Limit"] == "100"
+
+def test_authenticated_requests_are_limited_per_user():
+    limiter = RateLimiter()
+    client, _ = make_app(limiter)
+    token = create_access_token({"sub": "42"})
+
+    client.get("/api/v1/items", headers={"Authorization": f"Bearer {token}"})
+    client.get("/api/v1/items", headers={"Authorization": "Bearer not-a-token"})
+    assert sorted(limiter.arrivals) == ["api:ip:testclient", "api:user:42"]
+
+def test_spoofed_forwarded_for_does_not_reset_the_auth_budget():
+    client, calls = make_app(RateLimiter())
+
+    responses = [
+        client.post("/api/v1/auth/login", json={}, headers={"X-Forwarded-For": f"203.0.113.{n}"})
+        for n in range(6)
+    ]
+    assert [response.status_code for response in responses] == [200] * 5 + [429]
+
+def test_forwarded_for_is_used_behind_a_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+    limiter = RateLimiter()
+
+    def client_ip(peer, forwarded):
+        return limiter.get_client_ip(Request({
+            "type": "http", "client": (peer, 1234),
+            "headers": [(b"x-forwarded-for", forwarded.encode())],
+        }))
+
+    assert client_ip("10.0.0.5", "198.51.100.7, 203.0.113.9, 10.0.0.6") == "203.0.113.9"
+    assert client_ip("198.51.100.1", "203.0.113.9") == "198.51.100.1"
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core import revocation, security
+from app.core.revocation import BloomFilter, TokenRevocationList
+from main import app
+
+def test_revoked_tokens_are_rejected_even_when_cached(monkeypatch):
+    revoked = TokenRevocationList()
+    monkeypatch.setattr(revocation, "revoked_tokens", revoked)
+    token = security.create_access_token({"sub": "1", "sid": "session-1"})
+
+    async def scenario():
+        await revoked.revoke("session-1", time.time() + 60)
+        await revocation.ensure_not_revoked(security.decode_token(token))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 401
+    other = security.decode_token(security.create_access_token({"sub": "1", "sid": "session-2"}))
+    asyncio.run(revocation.ensure_not_revoked(other))
+
+def test_only_possible_filter_hits_are_confirmed_in_redis(monkeypatch):
+    revoked = TokenRevocationList()
+    revoked._filter.add("false-positive")
+    lookups = []
+
+    async def run(command):
+        lookups.append(command)
+        return [None]
+
+    monkeypatch.setattr(revocation.cache_service, "run", run)
+    assert not asyncio.run(revoked.is_revoked("unrelated", None))
+    assert lookups == []
+    assert not asyncio.run(revoked.is_revoked("false-positive"))
+    assert len(lookups) == 1
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    ids = [uuid.uuid4().hex for _ in range(1000)]
+    for revoked_id in ids:
+        bloom.add(revoked_id)
+
+    assert all(revoked_id in bloom for revoked_id in ids)
+    assert sum(uuid.uuid4().hex in bloom for _ in range(10000)) < 300
+
+def test_logout_revokes_the_refresh_token_too(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    client = TestClient(app)
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    client.post("/api/v1/auth/register", json={"email": email, "username": email[:12], "password": "testpassword123"})
+    tokens = client.post("/api/v1/auth/login", json={"email": email, "password": "testpassword123"}).json()
+    access = {"Authorization": f"Bearer {tokens['access_token']}"}
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    # Access tokens cannot be used to refresh, nor refresh tokens to authenticate
+    assert client.post("/api/v1/auth/refresh", headers=access).status_code == 401
+    assert client.get("/api/v1/users/me", headers=refresh).status_code == 401
+
+    assert client.post("/api/v1/auth/logout", headers=access).status_code == 200
+    assert security._verified_tokens.get(security._token_digest(tokens["access_token"])) is None
+    assert client.post("/api/v1/auth/refresh", headers=refresh).status_code == 401
+
+def test_refresh_tokens_are_single_use(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    client = TestClient(app)
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    client.post("/api/v1/auth/register", json={"email": email, "username": email[:12], "password": "testpassword123"})
+    tokens = client.post("/api/v1/auth/login", json={"email": email, "password": "testpassword123"}).json()
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    renewed = client.post("/api/v1/auth/refresh", headers=refresh)
+    assert renewed.status_code == 200
+    assert security._verified_tokens.get(security._token_digest(tokens["refresh_token"])) is None
+    assert client.post("/api/v1/auth/refresh", headers=refresh).status_code == 401
+    assert client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {renewed.json()['access_token']}"}).status_code == 200
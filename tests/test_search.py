@@ -0,0 +1,66 @@
+from alembic import command
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.migrations import get_alembic_config
+from app.models.music import Track
+from app.services.search import TrackSearchService
+
+def make_session(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'search.db'}"
+    config = get_alembic_config()
+    config.set_main_option("sqlalchemy.url", database_url)
+    command.upgrade(config, "head")
+    return sessionmaker(bind=create_engine(database_url))()
+
+def test_search_ranks_title_matches_first(tmp_path):
+    db = make_session(tmp_path)
+    db.add_all([
+        Track(title="Midnight City", artist="M83", album="Hurry Up, We're Dreaming"),
+        Track(title="Blinding Lights", artist="The Weeknd", album="After Hours"),
+        Track(title="Save Your Tears", artist="The Weeknd", album="After Hours", popularity=90),
+        Track(title="Anti-Hero", artist="Taylor Swift", album="Midnights"),
+    ])
+    db.commit()
+
+    service = TrackSearchService(db)
+
+    assert [t.title for t in service.search("midnight")] == ["Midnight City", "Anti-Hero"]
+    assert {t.title for t in service.search("weeknd")} == {"Save Your Tears", "Blinding Lights"}
+    assert [t.title for t in service.search("blind wee")] == ["Blinding Lights"]
+    assert service.search('"*') == []
+
+def test_search_index_follows_updates_and_deletes(tmp_path):
+    db = make_session(tmp_path)
+    track = Track(title="Heat Waves", artist="Glass Animals")
+    db.add(track)
+    db.commit()
+
+    track.title = "Tokyo Drifting"
+    db.commit()
+    service = TrackSearchService(db)
+    assert service.search("heat") == []
+    assert [t.id for t in service.search("tokyo")] == [track.id]
+
+    db.delete(track)
+    db.commit()
+    assert service.search("tokyo") == []
+
+def test_search_pages_follow_relevance_order(tmp_path):
+    db = make_session(tmp_path)
+    db.add_all([Track(title=f"Love Song {i}", artist="Various") for i in range(5)])
+    db.add(Track(title="Love", artist="Love", album="Love"))
+    db.commit()
+
+    service = TrackSearchService(db)
+    expected = [t.id for t in service.search("love", limit=50)]
+
+    seen = []
+    page, cursor = service.search_page("love", 2)
+    seen.extend(t.id for t in page)
+    while cursor:
+        page, cursor = service.search_page("love", 2, cursor)
+        seen.extend(t.id for t in page)
+
+    assert seen == expected
+    assert len(seen) == 6
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import argon2
+
+from app.core import security
+from app.core.security import build_password_context
+
+def test_hashes_with_weaker_cost_are_upgraded_on_verify():
+    old_context = build_password_context(["bcrypt"], bcrypt_rounds=4)
+    new_context = build_password_context(["bcrypt"], bcrypt_rounds=5)
+    old_hash = old_context.hash("secret")
+
+    valid, new_hash = new_context.verify_and_update("secret", old_hash)
+    assert valid is True
+    assert new_hash is not None and "$05$" in new_hash
+    assert new_context.verify_and_update("secret", new_hash) == (True, None)
+
+def test_wrong_password_is_never_rehashed():
+    context = build_password_context(["bcrypt"], bcrypt_rounds=5)
+    old_hash = build_password_context(["bcrypt"], bcrypt_rounds=4).hash("secret")
+
+    assert context.verify_and_update("wrong", old_hash) == (False, None)
+
+def test_argon2_without_its_backend_falls_back_to_bcrypt():
+    if argon2.has_backend():
+        pytest.skip("argon2-cffi is installed")
+    context = build_password_context(["argon2", "bcrypt"], bcrypt_rounds=4)
+
+    assert context.default_scheme() == "bcrypt"
+
+def test_bcrypt_hashes_are_upgraded_to_argon2id():
+    if not argon2.has_backend():
+        pytest.skip("argon2-cffi is not installed")
+    bcrypt_hash = build_password_context(["bcrypt"], bcrypt_rounds=4).hash("secret")
+    context = build_password_context(["argon2", "bcrypt"], argon2_time_cost=1, argon2_memory_cost=1024)
+
+    valid, new_hash = context.verify_and_update("secret", bcrypt_hash)
+    assert valid is True
+    assert new_hash.startswith("$argon2id$")
+
+def test_repeated_tokens_are_verified_once(monkeypatch):
+    token = security.create_access_token({"sub": "1"})
+    calls = []
+    verify = security._verify_token_signature
+    monkeypatch.setattr(security, "_verify_token_signature", lambda t: calls.append(t) or verify(t))
+
+    assert security.verify_token(token) == "1"
+    assert security.verify_token(token) == "1"
+    assert len(calls) == 1
+
+    security.forget_token(token)
+    security.verify_token(token)
+    assert len(calls) == 2
+
+def test_expired_tokens_are_not_served_from_the_cache():
+    token = security.create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as error:
+        security.verify_token(token)
+    assert error.value.status_code == 401
+    assert security._verified_tokens.get(security._token_digest(token)) is None